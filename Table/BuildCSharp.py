@@ -1,5 +1,6 @@
 from common import arg
 from common import pipeline
+from common import watch
 
 if __name__ == '__main__':
     arg_parser = arg.new_arg_parser()
@@ -7,5 +8,10 @@ if __name__ == '__main__':
 
     args = arg_parser.parse_args()
 
-    pipeline = pipeline.new_pipeline()
-    pipeline.execute(args.xls_dir)
+    if args.watch:
+        watch_pipeline = pipeline.new_watch_pipeline(args.csv_dir, args.temp_dir, args.proto_dir, args.xml_backend)
+        watch.WatchBuild(watch_pipeline, args.xls_dir, args.watch_interval).run()
+    else:
+        pipeline = pipeline.new_pipeline(args.csv_dir, args.temp_dir, args.incremental, args.streaming,
+                                         args.xml_backend)
+        pipeline.execute(args.xls_dir)
@@ -0,0 +1,9 @@
+from common import arg
+from common import pipeline
+
+if __name__ == '__main__':
+    arg_parser = arg.proto_arg_parser()
+    args = arg_parser.parse_args()
+
+    pipeline = pipeline.new_proto_pipeline(args.proto_dir, args.xml_backend)
+    pipeline.execute(args.xls_dir)
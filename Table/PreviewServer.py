@@ -0,0 +1,8 @@
+from common import arg
+from common import preview
+
+if __name__ == '__main__':
+    arg_parser = arg.preview_server_arg_parser()
+    args = arg_parser.parse_args()
+
+    preview.PreviewServer(args.xls_dir, args.host, args.port, args.xml_backend).run()
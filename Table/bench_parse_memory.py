@@ -0,0 +1,161 @@
+"""
+Peak memory of reading a huge xlsx, to size the memory cap of a build worker
+a synthetic table sheet of 1M rows, each with a string of its own like a localization sheet, unless --xls_path
+rows streamed from the sheet xml must keep memory flat however many rows are read: parsed <row> and <si>
+elements are detached as they are read, only the shared strings and the parsed table grow with the rows
+memory is the peak traced by tracemalloc, lxml keeps its elements in libxml2 where they are not traced
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from common import xls
+from common import xlrd
+from common.xlrd import xlsx
+
+Backends = ['expat', 'etree', 'lxml']
+SheetName = 'Item'
+
+
+def _col_name(colx):
+    name = ''
+    colx += 1
+    while colx:
+        colx, rem = divmod(colx - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _synthetic_rows(row_count):
+    """
+    :return: iterator of row values, header rows first, see XlsParser
+    """
+    header = {
+        xls.XlsParser.TagRow: ['cs', 'cs', 'c', 'cs'],
+        xls.XlsParser.DataTypeRow: ['INT', 'STRING', 'INT', 'INT[]'],
+        xls.XlsParser.FieldNameRow: ['id', 'text', 'count', 'items'],
+    }
+    for rowx in range(xls.XlsParser.ContentStartRow):
+        yield header.get(rowx, ['design notes'] if 0 == rowx else [])
+
+    for i in range(row_count):
+        yield [i + 1, f'text_{i}', i % 1000, f'[{i % 7},{i % 5}]']
+
+
+def write_synthetic_xlsx(path, row_count):
+    """
+    xml is written as rows are made, the 1M row workbook is never held in memory as a whole
+    """
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    sst_index = {}
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0"?><Relationships '
+                    'xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org'
+                    '/officeDocument/2006/relationships/worksheet"/>'
+                    '<Relationship Id="rIdS" Target="sharedStrings.xml" Type="http://schemas.openxmlformats.org'
+                    '/officeDocument/2006/relationships/sharedStrings"/></Relationships>')
+        zf.writestr('xl/workbook.xml',
+                    f'<?xml version="1.0"?><workbook {ns} '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<sheets><sheet name="{SheetName}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet_file:
+            sheet_file.write(f'<?xml version="1.0"?><worksheet {ns}><sheetData>'.encode())
+            for rowx, cells in enumerate(_synthetic_rows(row_count)):
+                out = [f'<row r="{rowx + 1}">']
+                for colx, value in enumerate(cells):
+                    ref = f'{_col_name(colx)}{rowx + 1}'
+                    if isinstance(value, int):
+                        out.append(f'<c r="{ref}"><v>{value}</v></c>')
+                    else:
+                        out.append(f'<c r="{ref}" t="s"><v>{sst_index.setdefault(value, len(sst_index))}</v></c>')
+                out.append('</row>')
+                sheet_file.write(''.join(out).encode())
+            sheet_file.write(b'</sheetData></worksheet>')
+
+        with zf.open('xl/sharedStrings.xml', 'w', force_zip64=True) as sst_file:
+            sst_file.write(f'<?xml version="1.0"?><sst {ns}>'.encode())
+            # dict keeps insertion order, the order of indices
+            for text in sst_index:
+                sst_file.write(f'<si><t>{text}</t></si>'.encode())
+            sst_file.write(b'</sst>')
+
+
+def _measure(name, func):
+    """
+    print seconds and peak traced memory of func(), with what it returns
+    """
+    tracemalloc.start()
+    start_time = time.time()
+    try:
+        extra = func()
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f'{name:24} {time.time() - start_time:7.1f}s  peak {peak / 1024 / 1024:8.1f}MB  {extra}', flush=True)
+
+
+def _open_shared_strings(xls_path):
+    with xlrd.open_workbook(xls_path, on_demand=True, values_only=True) as book:
+        return f'{len(book._sharedstrings)} shared strings'
+
+
+def _stream_rows(xls_path, sheet_name, backend):
+    """
+    read all rows and drop them, traced memory is sampled at rows 1, 4, 16, ...
+    only a few decoded strings are kept, memory growing with the rows is the xml side
+    """
+    with xlrd.open_workbook(xls_path, on_demand=True, values_only=True, lazy_shared_strings=True,
+                            shared_strings_cache_size=1024, xml_backend=backend) as book:
+        samples = []
+        next_sample = 1
+        for rowx, _, _ in book.iter_sheet_rows(sheet_name):
+            if rowx + 1 >= next_sample:
+                samples.append(f'{rowx + 1}: {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.1f}')
+                next_sample = (rowx + 1) * 4
+        return 'current MB at row ' + ', '.join(samples)
+
+
+def _parse_table(xls_path, sheet_name, backend):
+    rs, table_or_err = xls.XlsParser(columnar=True, xml_backend=backend).parse_one_sheet(xls_path, sheet_name)
+    if not rs:
+        return f'parse failed: {table_or_err}'
+    return f'{len(table_or_err.body)} rows'
+
+
+def bench(xls_path, sheet_name, backends):
+    _measure('open, shared strings', lambda: _open_shared_strings(xls_path))
+    for backend in backends:
+        _measure(f'stream rows, {backend}', lambda: _stream_rows(xls_path, sheet_name, backend))
+    for backend in backends:
+        _measure(f'parse table, {backend}', lambda: _parse_table(xls_path, sheet_name, backend))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Xlsx Parse Memory Benchmark')
+    arg_parser.add_argument('--xls_path', help='xlsx to read, a synthetic one is made if not given')
+    arg_parser.add_argument('--sheet_name', default=SheetName, help='sheet to read of xls_path')
+    arg_parser.add_argument('--rows', type=int, default=1000000, help='body rows of the synthetic sheet')
+    args = arg_parser.parse_args()
+
+    available_backends = []
+    for backend_name in Backends:
+        try:
+            xlsx.get_xml_backend(backend_name)
+            available_backends.append(backend_name)
+        except xlrd.XLRDError:
+            print(f'xml backend {backend_name} is not installed, skipped')
+
+    if args.xls_path:
+        bench(args.xls_path, args.sheet_name, available_backends)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            synthetic_path = os.path.join(temp_dir, f'{SheetName}.xlsx')
+            write_synthetic_xlsx(synthetic_path, args.rows)
+            print(f'synthetic sheet of {args.rows} rows, {os.path.getsize(synthetic_path) / 1024 / 1024:.1f}MB xlsx')
+            bench(synthetic_path, SheetName, available_backends)
@@ -0,0 +1,161 @@
+"""
+Column projection must never change which rows a sheet has, see xlrd Book.iter_sheet_rows
+random sheets with designer-only columns are parsed twice and the csv compared:
+streamed on demand, non-exported columns projected out, and from the fully loaded sheet, nothing projected
+"""
+import argparse
+import io
+import random
+import sys
+import zipfile
+
+from common import xls
+from common import xlrd
+from common.table import TableDataUtil
+
+Backends = ['expat', 'etree', 'lxml']
+
+
+def _col_name(colx):
+    name = ''
+    colx += 1
+    while colx:
+        colx, rem = divmod(colx - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _cell_xml(ref, value, sst):
+    if value is None:
+        # empty cell element, no value, never stored
+        return f'<c r="{ref}"/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if value.startswith('='):
+        # formula string result
+        return f'<c r="{ref}" t="str"><f>A1</f><v>{value[1:]}</v></c>'
+    sst.append(value)
+    return f'<c r="{ref}" t="s"><v>{len(sst) - 1}</v></c>'
+
+
+def _random_sheet_xml(rnd, sst):
+    """
+    :return: worksheet xml of a table whose non-exported columns hold notes, in the body and after it
+    """
+    width = rnd.randint(2, 7)
+    exported = [0] + [colx for colx in range(1, width) if rnd.random() < 0.6]
+    header = {
+        xls.XlsParser.TagRow: ['cs' if colx in exported else None for colx in range(width)],
+        xls.XlsParser.DataTypeRow: ['INT' if colx in exported else None for colx in range(width)],
+        xls.XlsParser.FieldNameRow: [f'f{colx}' if colx in exported else None for colx in range(width)],
+    }
+    # notes may also sit beyond the header, right of the last column
+    note_cols = [colx for colx in range(width + 2) if colx not in exported]
+    notes = ['note', 'x', 7, True, '=formula', None]
+
+    rows = []
+    for rowx in range(xls.XlsParser.ContentStartRow):
+        cells = header.get(rowx)
+        rows.append([[colx, value] for colx, value in enumerate(cells) if value is not None] if cells else [])
+
+    # big enough sometimes to span several reads of the streamed sheet xml
+    body_count = rnd.choice([rnd.randint(0, 30), rnd.randint(2000, 4000)])
+    for rowx in range(body_count):
+        kind = rnd.random()
+        if kind < 0.15:
+            rows.append([[rnd.choice(note_cols), rnd.choice(notes)]])
+        elif kind < 0.2:
+            rows.append([])
+        else:
+            cells = [[colx, rnd.randint(-5, 99)] for colx in exported if rnd.random() < 0.9]
+            cells += [[colx, rnd.choice(notes)] for colx in note_cols if rnd.random() < 0.2]
+            rows.append(sorted(cells))
+    for _ in range(rnd.randint(0, 3)):
+        rows.append([[rnd.choice(note_cols), rnd.choice(notes)]])
+
+    out = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+           '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">']
+    if rnd.random() < 0.5:
+        out.append(f'<dimension ref="A1:{_col_name(width - 1)}{len(rows)}"/>')
+    out.append('<sheetData>')
+    for rowx, cells in enumerate(rows):
+        if not cells and rnd.random() < 0.5:
+            continue
+        out.append(f'<row r="{rowx + 1}">')
+        out.extend(_cell_xml(f'{_col_name(colx)}{rowx + 1}', value, sst) for colx, value in cells)
+        out.append('</row>')
+    out.append('</sheetData></worksheet>')
+    return ''.join(out)
+
+
+def _random_xlsx(rnd):
+    sst = []
+    sheet_xml = _random_sheet_xml(rnd, sst)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0"?><Relationships '
+                    'xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org'
+                    '/officeDocument/2006/relationships/worksheet"/>'
+                    '<Relationship Id="rIdS" Target="sharedStrings.xml" Type="http://schemas.openxmlformats.org'
+                    '/officeDocument/2006/relationships/sharedStrings"/></Relationships>')
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0"?><workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    '<sheets><sheet name="T" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr('xl/worksheets/sheet1.xml', sheet_xml)
+        zf.writestr('xl/sharedStrings.xml',
+                    '<?xml version="1.0"?><sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    + ''.join(f'<si><t>{text}</t></si>' for text in sst) + '</sst>')
+    return buf.getvalue()
+
+
+def _describe(result):
+    rs, table_or_err = result
+    return TableDataUtil.to_csv(table_or_err) if rs else str(table_or_err)
+
+
+def check(seed, count, backends):
+    """
+    :return: number of sheets whose streamed csv differs from the loaded one
+    """
+    rnd = random.Random(seed)
+    mismatches = 0
+    for sheet_index in range(count):
+        contents = _random_xlsx(rnd)
+        parser = xls.XlsParser(columnar=True)
+        # fully loaded sheet, its rows are never projected
+        expected = _describe(parser.parse_book_sheet('T.xlsx', xlrd.open_workbook(file_contents=contents), 'T'))
+
+        for backend in backends:
+            parser = xls.XlsParser(columnar=True, xml_backend=backend)
+            with xlrd.open_workbook(file_contents=contents, on_demand=True, values_only=True,
+                                    lazy_shared_strings=True, xml_backend=backend) as book:
+                streamed = _describe(parser.parse_book_sheet('T.xlsx', book, 'T'))
+            if streamed != expected:
+                mismatches += 1
+                print(f'seed {seed} sheet {sheet_index} {backend}: streamed csv differs from loaded csv')
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Column Projection Check')
+    arg_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    arg_parser.add_argument('--count', type=int, default=300, help='random sheets to check')
+    args = arg_parser.parse_args()
+
+    available_backends = []
+    for name in Backends:
+        try:
+            xlrd.open_workbook(file_contents=_random_xlsx(random.Random(0)), on_demand=True, xml_backend=name)
+            available_backends.append(name)
+        except xlrd.XLRDError:
+            print(f'xml backend {name} is not installed, skipped')
+
+    mismatch_count = check(args.seed, args.count, available_backends)
+    print(f'{args.count} sheets, backends {available_backends}, {mismatch_count} mismatches')
+    sys.exit(1 if mismatch_count else 0)
@@ -0,0 +1,219 @@
+"""
+The array literal scanners of ElemAnalyzer must accept, reject and report exactly like the regex path they replaced
+random and mutated INT[], STRING[], INT[][] and STRING[][] literals are checked by both, results compared
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from common.elem import ElemAnalyzer
+
+
+class RegexAnalyzer:
+    """
+    array parsers as they were before the scanners, whole literals matched by the array patterns of ElemAnalyzer
+    """
+    IntArrayRegex = re.compile(f'^{ElemAnalyzer.IntArrayPattern}$')
+    Int2DArrayRegex = re.compile(rf'^{ElemAnalyzer.Int2DArrayPattern}$')
+    QuotedStrArrayRegex = re.compile(f'^{ElemAnalyzer.QuotedStrArrayPattern}$')
+    QuotedStr2DArrayRegex = re.compile(rf'^{ElemAnalyzer.QuotedStr2DArrayPattern}$')
+
+    @staticmethod
+    def parse_int_array(text: str):
+        m = RegexAnalyzer.IntArrayRegex.match(text)
+        if m is not None:
+            rs, parsed_values_or_err = RegexAnalyzer._parse_int_array_impl(m.group(1))
+            if rs:
+                return [True, text, parsed_values_or_err]
+            else:
+                return [False, parsed_values_or_err, '']
+        else:
+            return [False, f'{text} is not int array', '']
+
+    @staticmethod
+    def _parse_int_array_impl(text: str):
+        # empty array
+        if text is None:
+            return [True, []]
+
+        ints = []
+        for seg in text.split(','):
+            rs, int_or_err = ElemAnalyzer._parse_int_impl(seg)
+            if rs:
+                ints.append(int_or_err)
+            else:
+                return [False, f'{int_or_err} in {text}']
+
+        return [True, ints]
+
+    @staticmethod
+    def parse_str_array(text: str):
+        m = RegexAnalyzer.QuotedStrArrayRegex.match(text)
+        if m is not None:
+            rs, parsed_values_or_err = RegexAnalyzer._parse_str_array_impl(m.group(1))
+            if rs:
+                return [True, text, parsed_values_or_err]
+            else:
+                return [False, parsed_values_or_err, '']
+        else:
+            return [False, f'{text} is not string array', '']
+
+    @staticmethod
+    def _parse_str_array_impl(text: str):
+        if text is None:
+            return [True, []]
+
+        parsed_values = []
+        for seg in ElemAnalyzer.QuotedStrSepRegex.split(text):
+            rs, ori_text_or_err, parsed_text = ElemAnalyzer._parse_quoted_str(seg)
+            if rs:
+                parsed_values.append(parsed_text)
+            else:
+                return [False, f'{ori_text_or_err} in {text}']
+
+        return [True, parsed_values]
+
+    @staticmethod
+    def parse_int_2d_array(text: str):
+        m = RegexAnalyzer.Int2DArrayRegex.match(text)
+        if m is not None:
+            rs, parsed_ints_or_err = RegexAnalyzer._parse_2d_array_impl(m.group(1), RegexAnalyzer.parse_int_array)
+            if rs:
+                return [True, text, parsed_ints_or_err]
+            else:
+                return [False, parsed_ints_or_err, '']
+
+        return [False, f'{text} is not int 2d array', '']
+
+    @staticmethod
+    def parse_str_2d_array(text: str):
+        m = RegexAnalyzer.QuotedStr2DArrayRegex.match(text)
+        if m is not None:
+            rs, parsed_strs_or_err = RegexAnalyzer._parse_2d_array_impl(m.group(1), RegexAnalyzer.parse_str_array)
+            if rs:
+                return [True, text, parsed_strs_or_err]
+            else:
+                return [False, parsed_strs_or_err, '']
+
+        return [False, f'{text} is not str 2d array', '']
+
+    @staticmethod
+    def _parse_2d_array_impl(text: str, parse_array):
+        if text is None:
+            return [True, []]
+
+        parsed_2d_arr = []
+        for arr in ElemAnalyzer.ArraySepRegex.split(text):
+            rs, csv_arr_or_err, parsed_arr = parse_array(arr)
+            if rs:
+                parsed_2d_arr.append(parsed_arr)
+            else:
+                return [False, csv_arr_or_err]
+
+        return [True, parsed_2d_arr]
+
+
+ParserNames = ['parse_int_array', 'parse_int_2d_array', 'parse_str_array', 'parse_str_2d_array']
+# pieces of literals and the characters the scanners treat specially: unicode spaces and digits, new lines
+Atoms = ['[', ']', '"', ',', ' ', '\n', '\t', '　', '\x1c', '\x85', '0', '1', '9', '12', '+', '-', '٣',
+         '１', 'a', 'Nan', '\r', '""', '"a"', '[1]', '[]', '["x"]', ' , ', '],[', '","']
+
+
+def _space(rnd):
+    return rnd.choice(['', '', ' ', '  ', '\n', '\t ', '　'])
+
+
+def _random_text(rnd):
+    return ''.join(rnd.choice(Atoms) for _ in range(rnd.randint(0, 14)))
+
+
+def _random_int(rnd):
+    return rnd.choice(['', '+', '-']) + rnd.choice(['0', '1', '23', '905', '01', '٣', '1٣'])
+
+
+def _random_str(rnd):
+    return '"' + rnd.choice(['a', '', ' ', 'Nan', ' Nan ', 'a,b', '"', '","', '[', ']', 'x\ny', 'a b']) + '"'
+
+
+def _random_array(rnd, random_elem):
+    if rnd.random() < 0.1:
+        return '[' + _space(rnd) + ']'
+    return '[' + _space(rnd) + (_space(rnd) + ',').join(_space(rnd) + random_elem(rnd) + _space(rnd)
+                                                         for _ in range(rnd.randint(1, 4))) + ']'
+
+
+def _mutate(rnd, text):
+    chars = list(text)
+    for _ in range(rnd.randint(0, 3)):
+        op = rnd.random()
+        pos = rnd.randint(0, len(chars))
+        if op < 0.4:
+            chars.insert(pos, rnd.choice(Atoms))
+        elif op < 0.7 and chars:
+            del chars[min(pos, len(chars) - 1)]
+        elif chars:
+            chars[min(pos, len(chars) - 1)] = rnd.choice(Atoms)
+    return ''.join(chars) + ('\n' if rnd.random() < 0.1 else '')
+
+
+def _random_int_array(rnd):
+    return _random_array(rnd, _random_int)
+
+
+def _random_str_array(rnd):
+    return _random_array(rnd, _random_str)
+
+
+RandomLiterals = [_random_text, _random_int_array, _random_str_array,
+                  lambda rnd: _random_array(rnd, _random_int_array),
+                  lambda rnd: _random_array(rnd, _random_str_array)]
+
+
+def _differs(text):
+    """
+    :return: name of the first parser whose result on text differs from the regex path, None if all the same
+    """
+    for name in ParserNames:
+        if getattr(ElemAnalyzer, name)(text) != getattr(RegexAnalyzer, name)(text):
+            return name
+    return None
+
+
+def check(seed, count, all_chars):
+    """
+    :return: [literals checked, mismatches]
+    """
+    rnd = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        text = rnd.choice(RandomLiterals)(rnd)
+        texts.append(_mutate(rnd, text) if rnd.random() < 0.7 else text)
+    if all_chars:
+        # every character as a space, digit or quoted string candidate
+        for c in map(chr, range(sys.maxunicode + 1)):
+            texts.extend([f'[{c}1]', f'[1{c}]', f'[[1]{c}]', f'["{c}"]', f'["a"{c},"b"]', f'[[{c}"a"]]', f'[{c}]'])
+
+    mismatches = 0
+    for text in texts:
+        name = _differs(text)
+        if name is not None:
+            mismatches += 1
+            print(f'{name} {text!r}: scanner {getattr(ElemAnalyzer, name)(text)} '
+                  f'regex {getattr(RegexAnalyzer, name)(text)}')
+
+    return [len(texts), mismatches]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Array Literal Scanner Check')
+    arg_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    arg_parser.add_argument('--count', type=int, default=60000, help='random literals to check')
+    arg_parser.add_argument('--all_chars', action='store_true', help='also put every unicode character in literals')
+    args = arg_parser.parse_args()
+
+    start_time = time.time()
+    checked, mismatch_count = check(args.seed, args.count, args.all_chars)
+    print(f'{checked} literals, {mismatch_count} mismatches, elapse {time.time() - start_time:.1f} seconds')
+    sys.exit(1 if mismatch_count else 0)
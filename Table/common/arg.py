@@ -7,6 +7,16 @@ def new_arg_parser():
     arg_parser.add_argument("--xls_dir", required=True, help="xls input dir")
     arg_parser.add_argument("--csv_dir", required=True, help="csv dir")
     arg_parser.add_argument("--temp_dir", required=True, help="temp dir, save intermediate files")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="only parse and export changed xls, build manifest is saved in temp dir")
+    arg_parser.add_argument("--streaming", action="store_true",
+                            help="export each table as soon as it is parsed, instead of after all xls are parsed")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="keep running, rebuild each xls as soon as it is saved, incremental and streaming")
+    arg_parser.add_argument("--watch_interval", type=float, default=0.2,
+                            help="seconds between two polls of xls mtimes in watch mode")
+    arg_parser.add_argument("--proto_dir", help="also write .proto of changed tables in watch mode")
+    _prepare_xml_backend_parser(arg_parser)
 
     return arg_parser
 
@@ -16,6 +26,25 @@ def prepare_csharp_parser(parser):
     parser.add_argument("--cs_bytes", required=True, help="out csharp protobuf data dir")
 
 
+def proto_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Table Proto Generator')
+    arg_parser.add_argument('--xls_dir', required=True, help='xls input dir')
+    arg_parser.add_argument('--proto_dir', required=True, help='out proto dir')
+    _prepare_xml_backend_parser(arg_parser)
+
+    return arg_parser
+
+
+def preview_server_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Single Sheet Preview Server')
+    arg_parser.add_argument('--xls_dir', required=True, help='xls input dir, only its xls can be previewed')
+    arg_parser.add_argument('--host', default='127.0.0.1', help='listen address, local only by default')
+    arg_parser.add_argument('--port', type=int, default=8765, help='listen port')
+    _prepare_xml_backend_parser(arg_parser)
+
+    return arg_parser
+
+
 def single_xls_arg_parser():
     arg_parser = argparse.ArgumentParser(description='Single Xls Parser')
     _preparse_single_xls_parser(arg_parser)
@@ -31,6 +60,12 @@ def single_sheet_arg_parser():
     return arg_parser
 
 
+def _prepare_xml_backend_parser(parser):
+    parser.add_argument('--xml_backend', choices=['expat', 'etree', 'lxml'], default='expat',
+                        help='xlsx sheet xml parser, lxml must be installed')
+    return parser
+
+
 def _preparse_single_xls_parser(parser):
     parser.add_argument('--xls_path', required=True, help='xls file path')
     parser.add_argument('--csv_dir', required=True, help='export csv dir')
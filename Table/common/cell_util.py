@@ -8,6 +8,19 @@ def cell_str(sheet, cell_row, cell_col):
     return str(v)
 
 
+def cell_int(sheet, cell_row, cell_col):
+    """
+    typed access of a number cell, straight from the stored value, no int => str => int round trip
+    :return: same int cell_str gives for a number cell, None if the cell is not a number
+    """
+    # XL_CELL_NUMBER == 2, XL_CELL_DATE == 3
+    cell_type = sheet.cell_type(cell_row, cell_col)
+    if cell_type == 2 or cell_type == 3:
+        return int(sheet.cell_value(cell_row, cell_col))
+
+    return None
+
+
 def cell_xls_coord_str(row, col):
     """
     return cell coordinate str by zero based row and col
@@ -0,0 +1,585 @@
+import sys
+from array import array
+
+from .data import DataType
+from .elem import ElemAnalyzer
+from .field import Field
+from .row import Row, RowSemantic
+from .table import Header, Table
+from .tag import Tag
+
+
+class Column:
+    """
+    values of one field for all rows, csv text is derived from the value on demand
+    texts only keeps csv text not equal to the derived one, e.g. '+1', '[1, 2]' and design spec rows
+    """
+    __slots__ = ('texts',)
+
+    def __init__(self):
+        self.texts = {}
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def append(self, text: str, value):
+        raise NotImplementedError
+
+    def append_design(self, text: str):
+        """
+        design spec row, text is not checked, no value
+        """
+        raise NotImplementedError
+
+    def value(self, row: int):
+        raise NotImplementedError
+
+    def derive_text(self, row: int) -> str:
+        raise NotImplementedError
+
+    def text(self, row: int) -> str:
+        text = self.texts.get(row)
+        return self.derive_text(row) if text is None else text
+
+    def take(self, rows: list):
+        """
+        :param rows: row indices to keep
+        :return: new column of same type, only has rows
+        """
+        raise NotImplementedError
+
+    def extend(self, column):
+        """
+        append rows of column, which has the same type
+        """
+        raise NotImplementedError
+
+    def _extend_texts(self, column, row_count):
+        for row, text in column.texts.items():
+            self.texts[row_count + row] = text
+
+    def _take_texts(self, column, rows):
+        texts = self.texts
+        if texts:
+            for new_row, row in enumerate(rows):
+                text = texts.get(row)
+                if text is not None:
+                    column.texts[new_row] = text
+        return column
+
+    def __getstate__(self):
+        return self.texts
+
+    def __setstate__(self, state):
+        self.texts = state
+
+
+class IntDataColumn(Column):
+    """
+    ints in a typed array, a row with any int beyond int32 keeps its value in big_values instead
+    """
+    __slots__ = ('data', 'big_values')
+    TypeCode = 'i'
+
+    def __init__(self):
+        super().__init__()
+        self.data = array(self.TypeCode)
+        self.big_values = {}
+
+    def _big_value(self, row: int):
+        return self.big_values.get(row) if self.big_values else None
+
+    def _take_big_values(self, column, rows):
+        big_values = self.big_values
+        if big_values:
+            for new_row, row in enumerate(rows):
+                if row in big_values:
+                    column.big_values[new_row] = big_values[row]
+        return column
+
+    def _extend_data(self, column):
+        # data of an unpickled column is a typed memoryview, frombytes only takes a byte view
+        self.data.frombytes(memoryview(column.data).cast('B'))
+
+    def _extend_big_values(self, column, row_count):
+        for row, big_value in column.big_values.items():
+            self.big_values[row_count + row] = big_value
+
+
+class IntColumn(IntDataColumn):
+    """
+    INT, data[i] is the value of row i
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.data)
+
+    def append(self, text, value):
+        row = len(self.data)
+        try:
+            self.data.append(value)
+        except OverflowError:
+            self.data.append(0)
+            self.big_values[row] = value
+
+        if text != str(value):
+            self.texts[row] = text
+
+    def append_design(self, text):
+        self.texts[len(self.data)] = text
+        self.data.append(0)
+
+    def value(self, row):
+        big_value = self._big_value(row)
+        return self.data[row] if big_value is None else big_value
+
+    def derive_text(self, row):
+        return str(self.value(row))
+
+    def take(self, rows):
+        column = IntColumn()
+        data = self.data
+        column.data = array(self.TypeCode, [data[row] for row in rows])
+        self._take_big_values(column, rows)
+        return self._take_texts(column, rows)
+
+    def extend(self, column):
+        row_count = len(self.data)
+        self._extend_data(column)
+        self._extend_big_values(column, row_count)
+        self._extend_texts(column, row_count)
+
+    def __getstate__(self):
+        return self.texts, self.data.tobytes(), self.big_values
+
+    def __setstate__(self, state):
+        self.texts, data_bytes, self.big_values = state
+        # view on the unpickled bytes, no copy
+        self.data = memoryview(data_bytes).cast(self.TypeCode)
+
+
+class StrColumn(Column):
+    """
+    STRING, csv texts are interned, value is derived from text
+    """
+    __slots__ = ('strs',)
+
+    def __init__(self):
+        super().__init__()
+        self.strs = []
+
+    def __len__(self):
+        return len(self.strs)
+
+    def append(self, text, value):
+        self.strs.append(sys.intern(text))
+
+    def append_design(self, text):
+        self.strs.append(sys.intern(text))
+
+    def value(self, row):
+        text = self.strs[row]
+        return '' if ElemAnalyzer.EmptyStrHolder == text.strip() else text
+
+    def derive_text(self, row):
+        return self.strs[row]
+
+    def text(self, row):
+        return self.strs[row]
+
+    def take(self, rows):
+        column = StrColumn()
+        strs = self.strs
+        column.strs = [strs[row] for row in rows]
+        return column
+
+    def extend(self, column):
+        self.strs.extend(column.strs)
+
+    def __getstate__(self):
+        return self.strs
+
+    def __setstate__(self, state):
+        self.texts = {}
+        self.strs = [sys.intern(text) for text in state]
+
+
+class IntArrayColumn(IntDataColumn):
+    """
+    INT[], ints of all rows in one flat array, row i is data[offsets[i]:offsets[i + 1]]
+    """
+    __slots__ = ('offsets',)
+
+    def __init__(self):
+        super().__init__()
+        self.offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, text, value):
+        row = len(self.offsets) - 1
+        self._append_values(row, value)
+        if text != self._format(value):
+            self.texts[row] = text
+
+    def append_design(self, text):
+        self.texts[len(self.offsets) - 1] = text
+        self.offsets.append(len(self.data))
+
+    def value(self, row):
+        big_value = self._big_value(row)
+        if big_value is not None:
+            return list(big_value)
+        return list(self.data[self.offsets[row]:self.offsets[row + 1]])
+
+    def derive_text(self, row):
+        return self._format(self.value(row))
+
+    def take(self, rows):
+        column = IntArrayColumn()
+        for new_row, row in enumerate(rows):
+            column._append_values(new_row, self.value(row))
+        return self._take_texts(column, rows)
+
+    def extend(self, column):
+        row_count = len(self)
+        data_count = len(self.data)
+        self._extend_data(column)
+        self.offsets.extend(offset + data_count for offset in column.offsets[1:])
+        self._extend_big_values(column, row_count)
+        self._extend_texts(column, row_count)
+
+    def _append_values(self, row, values):
+        try:
+            self.data.extend(values)
+        except OverflowError:
+            del self.data[self.offsets[-1]:]
+            self.big_values[row] = values
+        self.offsets.append(len(self.data))
+
+    @staticmethod
+    def _format(values):
+        return f'[{",".join(map(str, values))}]'
+
+    def __getstate__(self):
+        return self.texts, self.offsets.tobytes(), self.data.tobytes(), self.big_values
+
+    def __setstate__(self, state):
+        self.texts, offsets_bytes, data_bytes, self.big_values = state
+        self.offsets = memoryview(offsets_bytes).cast('q')
+        self.data = memoryview(data_bytes).cast(self.TypeCode)
+
+
+class Int2DArrayColumn(IntDataColumn):
+    """
+    INT[][], row i has arrays row_offsets[i] to row_offsets[i + 1],
+    array j is data[array_offsets[j]:array_offsets[j + 1]]
+    """
+    __slots__ = ('row_offsets', 'array_offsets')
+
+    def __init__(self):
+        super().__init__()
+        self.row_offsets = array('q', [0])
+        self.array_offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.row_offsets) - 1
+
+    def append(self, text, value):
+        row = len(self.row_offsets) - 1
+        self._append_arrays(row, value)
+        if text != self._format(value):
+            self.texts[row] = text
+
+    def append_design(self, text):
+        self.texts[len(self.row_offsets) - 1] = text
+        self.row_offsets.append(len(self.array_offsets) - 1)
+
+    def value(self, row):
+        big_value = self._big_value(row)
+        if big_value is not None:
+            return [list(values) for values in big_value]
+
+        data = self.data
+        array_offsets = self.array_offsets
+        return [list(data[array_offsets[index]:array_offsets[index + 1]])
+                for index in range(self.row_offsets[row], self.row_offsets[row + 1])]
+
+    def derive_text(self, row):
+        return self._format(self.value(row))
+
+    def take(self, rows):
+        column = Int2DArrayColumn()
+        for new_row, row in enumerate(rows):
+            column._append_arrays(new_row, self.value(row))
+        return self._take_texts(column, rows)
+
+    def extend(self, column):
+        row_count = len(self)
+        array_count = len(self.array_offsets) - 1
+        data_count = len(self.data)
+        self._extend_data(column)
+        self.array_offsets.extend(offset + data_count for offset in column.array_offsets[1:])
+        self.row_offsets.extend(offset + array_count for offset in column.row_offsets[1:])
+        self._extend_big_values(column, row_count)
+        self._extend_texts(column, row_count)
+
+    def _append_arrays(self, row, arrays):
+        array_count = len(self.array_offsets)
+        try:
+            for values in arrays:
+                self.data.extend(values)
+                self.array_offsets.append(len(self.data))
+        except OverflowError:
+            del self.array_offsets[array_count:]
+            del self.data[self.array_offsets[-1]:]
+            self.big_values[row] = arrays
+        self.row_offsets.append(len(self.array_offsets) - 1)
+
+    @staticmethod
+    def _format(arrays):
+        return f'[{",".join(IntArrayColumn._format(values) for values in arrays)}]'
+
+    def __getstate__(self):
+        return self.texts, self.row_offsets.tobytes(), self.array_offsets.tobytes(), self.data.tobytes(), \
+            self.big_values
+
+    def __setstate__(self, state):
+        self.texts, row_offsets_bytes, array_offsets_bytes, data_bytes, self.big_values = state
+        self.row_offsets = memoryview(row_offsets_bytes).cast('q')
+        self.array_offsets = memoryview(array_offsets_bytes).cast('q')
+        self.data = memoryview(data_bytes).cast(self.TypeCode)
+
+
+class ObjectColumn(Column):
+    """
+    STRING[], STRING[][], csv texts and values kept as they are
+    """
+    __slots__ = ('strs', 'values')
+
+    def __init__(self):
+        super().__init__()
+        self.strs = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.strs)
+
+    def append(self, text, value):
+        self.strs.append(text)
+        self.values.append(value)
+
+    def append_design(self, text):
+        self.strs.append(text)
+        self.values.append('')
+
+    def value(self, row):
+        return self.values[row]
+
+    def derive_text(self, row):
+        return self.strs[row]
+
+    def text(self, row):
+        return self.strs[row]
+
+    def take(self, rows):
+        column = ObjectColumn()
+        column.strs = [self.strs[row] for row in rows]
+        column.values = [self.values[row] for row in rows]
+        return column
+
+    def extend(self, column):
+        self.strs.extend(column.strs)
+        self.values.extend(column.values)
+
+    def __getstate__(self):
+        return self.strs, self.values
+
+    def __setstate__(self, state):
+        self.texts = {}
+        self.strs, self.values = state
+
+
+ColumnTypes = {
+    ElemAnalyzer.ElemType.Int: IntColumn,
+    ElemAnalyzer.ElemType.Str: StrColumn,
+    ElemAnalyzer.ElemType.IntArray: IntArrayColumn,
+    ElemAnalyzer.ElemType.Int2DArray: Int2DArrayColumn,
+}
+
+
+def new_column(field: Field) -> Column:
+    elem_type = ElemAnalyzer.to_elem_type(field.data_type.elem_type, field.data_type.organization)
+    return ColumnTypes.get(elem_type, ObjectColumn)()
+
+
+class ColumnarRow:
+    """
+    row view of ColumnarTable, same read interface as Row
+    """
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def semantic(self):
+        return RowSemantic(self._table.semantics[self._row])
+
+    @property
+    def content(self):
+        row = self._row
+        return [column.text(row) for column in self._table.columns]
+
+    @property
+    def values(self):
+        row = self._row
+        if RowSemantic.DesignSpec == self._table.semantics[row]:
+            return [''] * len(self._table.columns)
+        return [column.value(row) for column in self._table.columns]
+
+
+class ColumnarBody:
+    """
+    read only sequence of ColumnarRow
+    """
+    __slots__ = ('_table',)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table.semantics)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [ColumnarRow(self._table, index) for index in range(*row.indices(len(self)))]
+
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('columnar row index out of range')
+
+        return ColumnarRow(self._table, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield ColumnarRow(self._table, row)
+
+
+class ColumnarTable(Table):
+    """
+    Table keeping one typed column per field instead of a Row per row
+    """
+
+    def __init__(self, name: str, xls: str):
+        self.columns = []
+        self.semantics = bytearray()
+        super().__init__(name, xls)
+
+    @property
+    def body(self):
+        return ColumnarBody(self)
+
+    @body.setter
+    def body(self, rows):
+        self.set_body(rows)
+
+    def set_header(self, header: Header):
+        super().set_header(header)
+        self.columns = [new_column(field) for field in header.get_fields()]
+        self.semantics = bytearray()
+
+    def add_row(self, row: Row):
+        self.semantics.append(row.semantic)
+        if RowSemantic.DesignSpec == row.semantic:
+            for column, text in zip(self.columns, row.content):
+                column.append_design(text)
+        else:
+            for column, text, value in zip(self.columns, row.content, row.values):
+                column.append(text, value)
+
+    def set_body(self, rows):
+        if self.header is not None:
+            self.columns = [new_column(field) for field in self.header.get_fields()]
+        self.semantics = bytearray()
+        for row in rows:
+            self.add_row(row)
+
+    def extend(self, table):
+        """
+        append rows of table, which has the same header, columns of this table must not be unpickled views
+        """
+        table = ColumnarTable.from_table(table)
+        self.semantics.extend(table.semantics)
+        for column, table_column in zip(self.columns, table.columns):
+            column.extend(table_column)
+
+    def content_rows(self) -> list:
+        """
+        csv texts of all rows, column by column
+        """
+        row_count = len(self.semantics)
+        text_columns = [[column.text(row) for row in range(row_count)] for column in self.columns]
+        return [list(texts) for texts in zip(*text_columns)]
+
+    def value_rows(self) -> list:
+        """
+        parsed values of all rows, column by column, design spec rows have no value
+        """
+        row_count = len(self.semantics)
+        value_columns = [[column.value(row) for row in range(row_count)] for column in self.columns]
+        empty_values = [''] * len(self.columns)
+        return [empty_values[:] if RowSemantic.DesignSpec == semantic else list(values)
+                for semantic, values in zip(self.semantics, zip(*value_columns))]
+
+    def content_row_indices(self) -> list:
+        return [row for row, semantic in enumerate(self.semantics) if RowSemantic.DesignSpec != semantic]
+
+    def select(self, fields: list, rows: list):
+        """
+        :param fields: fields to keep, from this table's header
+        :param rows: row indices to keep
+        :return: new ColumnarTable only with fields and rows
+        """
+        selected = ColumnarTable(self.name, self.xls)
+        header = Header(self.header.name)
+        for field in fields:
+            header.add_field(field)
+        selected.set_header(header)
+        # field_index of fields is stale after a select, find columns by field
+        column_indices = {id(field): index for index, field in enumerate(self.header.get_fields())}
+        selected.columns = [self.columns[column_indices[id(field)]].take(rows) for field in fields]
+        selected.semantics = bytearray(self.semantics[row] for row in rows)
+        return selected
+
+    @staticmethod
+    def from_table(table: Table):
+        if isinstance(table, ColumnarTable):
+            return table
+
+        columnar_table = ColumnarTable(table.name, table.xls)
+        columnar_table.set_header(table.header)
+        columnar_table.set_body(table.body)
+        return columnar_table
+
+    def __getstate__(self):
+        header_spec = [(int(field.tag), field.field_name, field.sheet_col, field.data_type.to_csv_str(),
+                        field.primary, field.field_index) for field in self.header.get_fields()]
+        return self.name, self.xls, self.header.name, header_spec, bytes(self.semantics), self.columns
+
+    def __setstate__(self, state):
+        self.name, self.xls, header_name, header_spec, semantics, columns = state
+
+        header = Header(header_name)
+        for tag, field_name, sheet_col, data_type_str, primary, field_index in header_spec:
+            field = Field(Tag(tag), field_name, sheet_col, DataType.parse(data_type_str), primary)
+            field.update_field_index(field_index)
+            header.add_field(field)
+
+        self.header = header
+        self.semantics = bytearray(semantics)
+        self.columns = columns
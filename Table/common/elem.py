@@ -1,5 +1,6 @@
 import re
 from enum import IntEnum
+from functools import lru_cache, partial
 
 from .converter import TypeToCSVStr, TypeToProtoStr
 from .log import debug_log
@@ -87,6 +88,150 @@ class ElemOrganizationParser:
         }.get(organization_str, lambda: None)()
 
 
+def _literal_end(text: str) -> int:
+    """
+    end of array literal, like $ of the array patterns, one trailing new line is allowed
+    """
+    return len(text) - 1 if text.endswith('\n') else len(text)
+
+
+def _skip_space(text: str, pos: int, end: int) -> int:
+    while pos < end and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+class LiteralDfa:
+    """
+    DFA of QuotedStr2DArrayPattern, built once from a small regex tree
+    the greedy .* inside quoted strings backtracks a lot in re, the DFA checks any text in one pass
+    regex tree: ('class', char classes), ('seq', [nodes]), ('star', node), ('opt', node)
+    """
+    LeftBracket = 0
+    RightBracket = 1
+    Quote = 2
+    Comma = 3
+    NewLine = 4
+    Space = 5
+    Other = 6
+    CharClasses = {'[': LeftBracket, ']': RightBracket, '"': Quote, ',': Comma, '\n': NewLine}
+    ClassCount = 7
+
+    def __init__(self, regex_tree):
+        self._epsilons = []
+        self._moves = []
+        start = self._new_state()
+        final = self._build(regex_tree, start)
+
+        dead = frozenset()
+        start_set = self._closure([start])
+        state_indices = {dead: 0, start_set: 1}
+        self._table = [[0] * self.ClassCount, None]
+        self._accepting = set()
+        self._start = 1
+
+        pending = [start_set]
+        while pending:
+            state_set = pending.pop()
+            row = []
+            for char_class in range(self.ClassCount):
+                next_set = self._closure([target for state in state_set for classes, target in self._moves[state]
+                                          if char_class in classes])
+                if next_set not in state_indices:
+                    state_indices[next_set] = len(self._table)
+                    self._table.append(None)
+                    pending.append(next_set)
+                row.append(state_indices[next_set])
+
+            self._table[state_indices[state_set]] = row
+            if final in state_set:
+                self._accepting.add(state_indices[state_set])
+
+    def accepts(self, text: str, end: int) -> bool:
+        table = self._table
+        char_classes = self.CharClasses
+        state = self._start
+        for i in range(end):
+            c = text[i]
+            char_class = char_classes.get(c)
+            if char_class is None:
+                char_class = self.Space if c.isspace() else self.Other
+            state = table[state][char_class]
+            if 0 == state:
+                return False
+
+        return state in self._accepting
+
+    def _new_state(self):
+        self._epsilons.append([])
+        self._moves.append([])
+        return len(self._moves) - 1
+
+    def _build(self, node, start):
+        """
+        :return: end state of node, always a new state without out edges
+        """
+        kind = node[0]
+        if 'class' == kind:
+            end = self._new_state()
+            self._moves[start].append((node[1], end))
+            return end
+        elif 'seq' == kind:
+            end = start
+            for child in node[1]:
+                end = self._build(child, end)
+            return end
+        elif 'star' == kind:
+            loop = self._new_state()
+            self._epsilons[start].append(loop)
+            self._epsilons[self._build(node[1], loop)].append(loop)
+            end = self._new_state()
+            self._epsilons[loop].append(end)
+            return end
+        else:
+            end = self._new_state()
+            self._epsilons[start].append(end)
+            self._epsilons[self._build(node[1], start)].append(end)
+            return end
+
+    def _closure(self, states):
+        closure = set(states)
+        pending = list(states)
+        while pending:
+            for state in self._epsilons[pending.pop()]:
+                if state not in closure:
+                    closure.add(state)
+                    pending.append(state)
+        return frozenset(closure)
+
+
+def _literal_class(*char_classes):
+    return 'class', frozenset(char_classes)
+
+
+_SpaceRun = ('star', _literal_class(LiteralDfa.Space, LiteralDfa.NewLine))
+# QuotedStr \".*"
+_QuotedStrTree = ('seq', [_literal_class(LiteralDfa.Quote),
+                          ('star', _literal_class(*(set(range(LiteralDfa.ClassCount)) - {LiteralDfa.NewLine}))),
+                          _literal_class(LiteralDfa.Quote)])
+# QuotedStrArrayPattern \[\s*(\s*{QuotedStr}\s*(,\s*{QuotedStr})*\s*)?]
+_QuotedStrArrayTree = ('seq', [
+    _literal_class(LiteralDfa.LeftBracket), _SpaceRun,
+    ('opt', ('seq', [_SpaceRun, _QuotedStrTree, _SpaceRun,
+                     ('star', ('seq', [_literal_class(LiteralDfa.Comma), _SpaceRun, _QuotedStrTree])),
+                     _SpaceRun])),
+    _literal_class(LiteralDfa.RightBracket)])
+# QuotedStr2DArrayPattern \[\s*({QuotedStrArrayPattern}\s*(,\s*{QuotedStrArrayPattern})*\s*)?]
+_QuotedStr2DArrayTree = ('seq', [
+    _literal_class(LiteralDfa.LeftBracket), _SpaceRun,
+    ('opt', ('seq', [_QuotedStrArrayTree, _SpaceRun,
+                     ('star', ('seq', [_literal_class(LiteralDfa.Comma), _SpaceRun, _QuotedStrArrayTree])),
+                     _SpaceRun])),
+    _literal_class(LiteralDfa.RightBracket)])
+
+Str2DArrayDfa = LiteralDfa(_QuotedStr2DArrayTree)
+
+
 class ElemAnalyzer:
     EmptyStrHolder = 'Nan'
 
@@ -105,66 +250,162 @@ class ElemAnalyzer:
     # use , separate str array; , must between prev right \" and next left \"
     QuotedStrSepPattern = r"(?<=\")\s*,\s*(?=\")"
 
+    # compiled once, cells are matched against them millions of times
+    # the array patterns above are not matched as a whole any more, adjacent \s* and the greedy .* backtrack
+    # badly on bad cells; they document the grammar checked in linear time by the array parsers below
+    # not one tokenizer for all array types: the patterns space the first element apart from the others and a
+    # quoted string may swallow quotes, commas and brackets, so each type gets its own check of the same language
+    # and values are still split out as before; valid STRING[][] cells cost ~15% more than the regex did,
+    # see check_literal_scan.py for the equivalence check
+    IntRegex = re.compile(rf'^{IntPattern}$')
+    # ints of IntArrayPattern after the leading spaces, no adjacent \s* so it never backtracks
+    IntListRegex = re.compile(rf'{IntPattern}\s*(,\s*{IntPattern}\s*)*')
+    # STRING[] and STRING[][] whose strings have no quote or new line, spaced like the first alternatives of
+    # QuotedStrArrayPattern and QuotedStr2DArrayPattern: a part of their language where the next char always
+    # decides, so re never backtracks far; most cells are accepted at C speed, the linear checks decide the rest
+    PlainQuotedStr = r'"[^"\n]*"'
+    PlainQuotedStrArrayPattern = rf'\[\s*({PlainQuotedStr}(,\s*{PlainQuotedStr})*\s*)?]'
+    PlainQuotedStrArrayRegex = re.compile(PlainQuotedStrArrayPattern)
+    PlainQuotedStr2DArrayRegex = re.compile(
+        rf'\[\s*({PlainQuotedStrArrayPattern}(,\s*{PlainQuotedStrArrayPattern})*\s*)?]')
+    QuotedStrRegex = re.compile(r'^"(.*)"$')
+    ArraySepRegex = re.compile(ArraySepPattern)
+    QuotedStrSepRegex = re.compile(QuotedStrSepPattern)
+    BlankRegex = re.compile(r'^\s*$')
+
     @staticmethod
     def parse_int_array(text: str):
-        m = re.match(f'^{ElemAnalyzer.IntArrayPattern}$', text)
-        if m is not None:
-            rs, parsed_values_or_err = ElemAnalyzer._parse_int_array_impl(m.group(1))
-            if rs:
-                return [True, text, parsed_values_or_err]
-            else:
-                return [False, parsed_values_or_err, '']
-        else:
+        end = _literal_end(text)
+        scanned = None
+        if end >= 2 and '[' == text[0] and ']' == text[end - 1]:
+            scanned = ElemAnalyzer._scan_int_array(text, 0, end - 1)
+
+        if scanned is None:
             return [False, f'{text} is not int array', '']
 
+        rs, parsed_values_or_err = ElemAnalyzer._int_array_values(scanned)
+        if rs:
+            return [True, text, parsed_values_or_err]
+        else:
+            return [False, parsed_values_or_err, '']
+
+    @staticmethod
+    def _scan_int_array(text: str, start: int, close: int):
+        """
+        check text[start:close + 1] is one IntArrayPattern, text[start] is [ and text[close] is ]
+        :return: (ints text, [, separated int texts]), int texts are None for empty array; None if not match
+        """
+        group = text[start + 1:close].lstrip()
+        # empty array
+        if not group:
+            return group, None
+
+        if ElemAnalyzer.IntListRegex.fullmatch(group) is None:
+            return None
+
+        return group, group.split(',')
+
     @staticmethod
-    def _parse_int_array_impl(text: str):
+    def _int_array_values(scanned):
+        group, segments = scanned
         # empty array
-        if text is None:
+        if segments is None:
             return [True, []]
 
-        segments = text.split(',')
+        try:
+            # segments are checked ints, int() only fails beyond the str digits limit
+            return [True, [int(segment) for segment in segments]]
+        except ValueError:
+            pass
+
         ints = []
-        for seg in segments:
-            rs, int_or_err = ElemAnalyzer._parse_int_impl(seg)
+        for segment in segments:
+            rs, int_or_err = ElemAnalyzer._parse_int_impl(segment)
             if rs:
                 ints.append(int_or_err)
             else:
-                return [False, f'{int_or_err} in {text}']
+                return [False, f'{int_or_err} in {group}']
 
         return [True, ints]
 
     @staticmethod
     def parse_str_array(text: str):
-        m = re.match(f'^{ElemAnalyzer.QuotedStrArrayPattern}$', text)
-        if m is not None:
-            rs, parsed_values_or_err = ElemAnalyzer._parse_str_array_impl(m.group(1))
-            if rs:
-                return [True, text, parsed_values_or_err]
-            else:
-                return [False, parsed_values_or_err, '']
-        else:
+        end = _literal_end(text)
+        if ElemAnalyzer.PlainQuotedStrArrayRegex.fullmatch(text, 0, end) is None and \
+                not ElemAnalyzer._is_str_array(text, end):
             return [False, f'{text} is not string array', '']
 
+        rs, parsed_values_or_err = ElemAnalyzer._parse_str_array_impl(text, end)
+        if rs:
+            return [True, text, parsed_values_or_err]
+        else:
+            return [False, parsed_values_or_err, '']
+
+    @staticmethod
+    def _is_str_array(text: str, end: int) -> bool:
+        r"""
+        text[:end] matches QuotedStrArrayPattern, in linear time
+        .* of quoted strings takes anything but new line, so between the outer quotes anything goes,
+        except a new line must be in a separator of two quoted strings: ,\s* or \s*,\s* for the first one
+        """
+        if end < 2 or '[' != text[0] or ']' != text[end - 1]:
+            return False
+
+        quoted = text[1:end - 1].strip()
+        # empty array
+        if not quoted:
+            return True
+        if len(quoted) < 2 or '"' != quoted[0] or '"' != quoted[-1]:
+            return False
+
+        chunk_start = 0
+        new_line = quoted.find('\n')
+        while new_line >= 0:
+            space_start = new_line
+            while quoted[space_start - 1].isspace():
+                space_start -= 1
+            space_end = _skip_space(quoted, new_line + 1, len(quoted))
+
+            # first separator is \s*,\s* the others are ,\s*
+            if 0 == chunk_start and ',' == quoted[space_end]:
+                space_end = _skip_space(quoted, space_end + 1, len(quoted))
+            elif ',' == quoted[space_start - 1]:
+                space_start -= 1
+                while 0 == chunk_start and quoted[space_start - 1].isspace():
+                    space_start -= 1
+            else:
+                return False
+
+            # quoted string before the separator has at least 2 quotes
+            if space_start - 1 <= chunk_start or '"' != quoted[space_start - 1] or '"' != quoted[space_end]:
+                return False
+
+            chunk_start = space_end
+            new_line = quoted.find('\n', space_end)
+
+        return len(quoted) - chunk_start >= 2
+
     @staticmethod
-    def _parse_str_array_impl(text: str):
-        if text is None:
+    def _parse_str_array_impl(text: str, end: int):
+        group_start = _skip_space(text, 1, end)
+        # empty array
+        if group_start == end - 1:
             return [True, []]
 
-        segments = re.split(ElemAnalyzer.QuotedStrSepPattern, text)
+        group = text[group_start:end - 1]
         parsed_values = []
-        for seg in segments:
+        for seg in ElemAnalyzer.QuotedStrSepRegex.split(group):
             rs, ori_text_or_err, parsed_text = ElemAnalyzer._parse_quoted_str(seg)
             if rs:
                 parsed_values.append(parsed_text)
             else:
-                return [False, f'{ori_text_or_err} in {text}']
+                return [False, f'{ori_text_or_err} in {group}']
 
         return [True, parsed_values]
 
     @staticmethod
     def _parse_quoted_str(text: str):
-        m = re.match(rf'^"(.*)"$', text.strip())
+        m = ElemAnalyzer.QuotedStrRegex.match(text.strip())
         if m is not None:
             rs, text, parsed_str = ElemAnalyzer.parse_str(m.group(1))
             if rs:
@@ -176,7 +417,7 @@ class ElemAnalyzer:
 
     @staticmethod
     def parse_int(text: str):
-        m = re.match(rf'^{ElemAnalyzer.IntPattern}$', text)
+        m = ElemAnalyzer.IntRegex.match(text)
         if m is not None:
             rs, int_or_err = ElemAnalyzer._parse_int_impl(text)
             if rs:
@@ -196,7 +437,7 @@ class ElemAnalyzer:
 
     @staticmethod
     def parse_str(text: str):
-        if re.match(r'^\s*$', text):
+        if ElemAnalyzer.BlankRegex.match(text):
             return [False, f'{text} is empty string, use Nan', '']
 
         value_text = str(text)
@@ -207,52 +448,89 @@ class ElemAnalyzer:
 
     @staticmethod
     def parse_int_2d_array(text: str):
-        m = re.match(rf'^{ElemAnalyzer.Int2DArrayPattern}$', text)
-        if m is not None:
-            rs, parsed_ints_or_err = ElemAnalyzer._parse_int_2d_array_impl(m.group(1))
-            if rs:
-                return [True, text, parsed_ints_or_err]
-            else:
-                return [False, parsed_ints_or_err, '']
-
-        return [False, f'{text} is not int 2d array', '']
+        end = _literal_end(text)
+        if end < 2 or '[' != text[0] or ']' != text[end - 1]:
+            return [False, f'{text} is not int 2d array', '']
+
+        # empty array, no space allowed inside
+        if ']' == text[1]:
+            if 2 == end:
+                return [True, text, []]
+            return [False, f'{text} is not int 2d array', '']
+
+        # (start, close, scanned) of each int array, only spaces and , between them
+        arrays = []
+        outer_close = end - 1
+        pos = 1
+        while True:
+            array_start = text.find('[', pos, outer_close)
+            array_close = text.find(']', array_start + 1, outer_close) if array_start >= 0 else -1
+            if array_close < 0:
+                return [False, f'{text} is not int 2d array', '']
+
+            gap = text[pos:array_start].strip()
+            scanned = ElemAnalyzer._scan_int_array(text, array_start, array_close)
+            if (',' != gap if arrays else gap) or scanned is None:
+                return [False, f'{text} is not int 2d array', '']
+
+            arrays.append((array_start, array_close, scanned))
+            pos = array_close + 1
+            if text.find('[', pos, outer_close) < 0:
+                if text[pos:outer_close].strip():
+                    return [False, f'{text} is not int 2d array', '']
+                break
+
+        rs, parsed_ints_or_err = ElemAnalyzer._parse_int_2d_array_impl(text, end, arrays)
+        if rs:
+            return [True, text, parsed_ints_or_err]
+        else:
+            return [False, parsed_ints_or_err, '']
 
     @staticmethod
-    def _parse_int_2d_array_impl(text: str):
-        if text is None:
-            return [True, []]
-
-        arrays = re.split(ElemAnalyzer.ArraySepPattern, text)
+    def _parse_int_2d_array_impl(text: str, end: int, arrays: list):
+        """
+        each array is checked as its own int array text: separated at ],[ the first one keeps the spaces after
+        the outer [, the last one keeps the spaces before the outer ]
+        """
         parsed_2d_arr = []
-        for arr in arrays:
-            rs, csv_arr_or_err, parsed_arr = ElemAnalyzer.parse_int_array(arr)
+        last = len(arrays) - 1
+        for index, (array_start, array_close, scanned) in enumerate(arrays):
+            piece_start = 1 if 0 == index else array_start
+            piece_end = end - 1 if last == index else array_close + 1
+
+            if piece_start != array_start or text[array_close + 1:piece_end] not in ('', '\n'):
+                return [False, f'{text[piece_start:piece_end]} is not int array']
+
+            rs, parsed_arr_or_err = ElemAnalyzer._int_array_values(scanned)
             if rs:
-                parsed_2d_arr.append(parsed_arr)
+                parsed_2d_arr.append(parsed_arr_or_err)
             else:
-                return [False, csv_arr_or_err]
+                return [False, parsed_arr_or_err]
 
         return [True, parsed_2d_arr]
 
     @staticmethod
     def parse_str_2d_array(text: str):
-        m = re.match(rf'^{ElemAnalyzer.QuotedStr2DArrayPattern}$', text)
-        if m is not None:
-            rs, parsed_str_2d_arr_or_err = ElemAnalyzer._parse_str_2d_array_impl(m.group(1))
-            if rs:
-                return [True, text, parsed_str_2d_arr_or_err]
-            else:
-                return [False, parsed_str_2d_arr_or_err, '']
-
-        return [False, f'{text} is not str 2d array', '']
+        end = _literal_end(text)
+        if ElemAnalyzer.PlainQuotedStr2DArrayRegex.fullmatch(text, 0, end) is None and \
+                not Str2DArrayDfa.accepts(text, end):
+            return [False, f'{text} is not str 2d array', '']
+
+        rs, parsed_str_2d_arr_or_err = ElemAnalyzer._parse_str_2d_array_impl(text, end)
+        if rs:
+            return [True, text, parsed_str_2d_arr_or_err]
+        else:
+            return [False, parsed_str_2d_arr_or_err, '']
 
     @staticmethod
-    def _parse_str_2d_array_impl(text: str):
-        if text is None:
+    def _parse_str_2d_array_impl(text: str, end: int):
+        group_start = _skip_space(text, 1, end)
+        # empty array
+        if group_start == end - 1:
             return [True, []]
 
-        str_arrays = re.split(ElemAnalyzer.ArraySepPattern, text)
         parsed_2d_str_arr = []
-        for str_array in str_arrays:
+        for str_array in ElemAnalyzer.ArraySepRegex.split(text[group_start:end - 1]):
             rs, csv_arr_or_err, parsed_str_arr = ElemAnalyzer.parse_str_array(str_array)
             if rs:
                 parsed_2d_str_arr.append(parsed_str_arr)
@@ -343,3 +621,78 @@ class ElemAnalyzer:
             return ElemAnalyzer.Tools.get('checker').get(elem_type)
 
         return None
+
+    @staticmethod
+    def get_converter(data_type):
+        """
+        checker function of data type itself, no per call dispatch
+        resolve it once per field, then call it for every cell of the field
+        :return: text => [bool, text_for_csv_or_err, actual_values], None for unknown type
+        """
+        return ElemAnalyzer.get_elem_converter(ElemAnalyzer.to_elem_type(data_type.elem_type, data_type.organization))
+
+    @staticmethod
+    def get_elem_converter(elem_type):
+        """
+        :return: text => [bool, text_for_csv_or_err, actual_values] of elem type, None for unknown type
+        """
+        return {
+            ElemAnalyzer.ElemType.Int: ElemAnalyzer.parse_int,
+            ElemAnalyzer.ElemType.Str: ElemAnalyzer.parse_str,
+            ElemAnalyzer.ElemType.IntArray: ElemAnalyzer.parse_int_array,
+            ElemAnalyzer.ElemType.StrArray: ElemAnalyzer.parse_str_array,
+            ElemAnalyzer.ElemType.Int2DArray: ElemAnalyzer.parse_int_2d_array,
+            ElemAnalyzer.ElemType.Str2DArray: ElemAnalyzer.parse_str_2d_array,
+        }.get(elem_type)
+
+
+def _freeze(value):
+    """
+    lists to tuples, recursively, so one parsed value can be shared by many cells
+    """
+    if isinstance(value, list):
+        return tuple(_freeze(elem) for elem in value)
+    return value
+
+
+class ParseCache:
+    """
+    bounded LRU cache of parse results, keyed by (elem type, text)
+    the same literal like [1001,1] is checked and parsed once, all its cells share one immutable value,
+    arrays are tuples instead of lists
+    """
+    DefaultMaxSize = 8192
+
+    def __init__(self, max_size=DefaultMaxSize):
+        self.max_size = max_size
+        self._parse = lru_cache(maxsize=max_size)(ParseCache._parse_text)
+
+    @staticmethod
+    def _parse_text(elem_type, text):
+        rs, text_for_csv_or_err, actual_values = ElemAnalyzer.get_elem_converter(elem_type)(text)
+        return rs, text_for_csv_or_err, _freeze(actual_values)
+
+    def get_converter(self, data_type):
+        """
+        cached version of ElemAnalyzer.get_converter
+        :return: text => (bool, text_for_csv_or_err, actual_values), None for unknown type
+        """
+        elem_type = ElemAnalyzer.to_elem_type(data_type.elem_type, data_type.organization)
+        if ElemAnalyzer.get_elem_converter(elem_type) is None:
+            return None
+
+        return partial(self._parse, elem_type)
+
+    def counters(self):
+        """
+        :return: [hits, misses, current size], to tune max_size
+        """
+        info = self._parse.cache_info()
+        return [info.hits, info.misses, info.currsize]
+
+    def clear(self):
+        self._parse.cache_clear()
+
+
+# parse cache of this process, literals repeat across sheets and xls too
+shared_parse_cache = ParseCache()
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import pickle
+
+from .log import debug_log
+
+
+def file_content_hash(file_path: str) -> str:
+    content_hash = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
+
+
+class BuildManifest:
+    """
+    On-disk record of the last build, saved in temp dir
+    xls abs path => {'hash': content hash, 'outputs': [exported files]}
+    parse results of every xls are pickled beside the manifest, reused while the content hash is unchanged,
+    a changed xls still reuses the results of its sheets whose fingerprint is unchanged
+    a warm manifest of a long-running build also keeps parse results in memory,
+    and trusts the content hash of an xls while its mtime and size are unchanged
+    """
+    # bump when parse result layout changes, old caches are dropped
+    Version = 3
+    FileName = 'build_manifest.json'
+    ParseCacheDir = 'parse_cache'
+
+    def __init__(self, temp_dir: str, warm: bool = False):
+        """
+        :param temp_dir: manifest and parse cache dir
+        :param warm: keep parse results and content hashes in memory between builds
+        """
+        self.temp_dir = temp_dir
+        self.warm = warm
+        self.manifest_path = os.path.join(temp_dir, self.FileName)
+        self.cache_dir = os.path.join(temp_dir, self.ParseCacheDir)
+        self._entries = {}
+        # current build state, not persisted
+        self._hashes = {}
+        self._unchanged = set()
+        self._stale_outputs = {}
+        # warm state, xls abs path => [mtime_ns, size, content hash] / sheet results
+        self._stats = {}
+        self._sheet_results = {}
+        self.load()
+
+    def load(self):
+        self._entries = {}
+        if not os.path.exists(self.manifest_path):
+            return
+
+        try:
+            with open(self.manifest_path, 'rt', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError) as err:
+            debug_log(f'manifest {self.manifest_path} is broken, full build. {err}')
+            return
+
+        if manifest.get('version') == self.Version:
+            self._entries = manifest.get('xls', {})
+
+    def save(self):
+        for xls_path, stale_outputs in self._stale_outputs.items():
+            entry = self._entries.get(xls_path)
+            exported = entry['outputs'] if entry else []
+            self._remove_files([output for output in stale_outputs if output not in exported])
+        self._stale_outputs = {}
+
+        os.makedirs(self.temp_dir, exist_ok=True)
+        with open(self.manifest_path, 'wt', encoding='utf-8') as manifest_file:
+            json.dump({'version': self.Version, 'xls': self._entries}, manifest_file, indent=1)
+
+    def sync(self, xls_list: list) -> list:
+        """
+        drop entries of deleted xls, remove their outputs and parse cache
+        :param xls_list: all xls of current build
+        :return: removed xls abs path list
+        """
+        alive = set(os.path.abspath(xls_path) for xls_path in xls_list)
+        removed = [xls_path for xls_path in self._entries if xls_path not in alive]
+        for xls_path in removed:
+            entry = self._entries.pop(xls_path)
+            self._remove_files(entry.get('outputs', []))
+            self._remove_files([self._cache_path(xls_path)])
+            self._stats.pop(xls_path, None)
+            self._sheet_results.pop(xls_path, None)
+            debug_log(f'{xls_path} is deleted, outputs removed')
+
+        return removed
+
+    def load_parse_result(self, xls_path: str):
+        """
+        load cached parse result if xls content is unchanged
+        :param xls_path: xls file path
+        :return: cached list of [bool, table_or_err], None if xls is changed or not cached
+        """
+        abs_xls = os.path.abspath(xls_path)
+        content_hash = self._content_hash(abs_xls)
+        self._hashes[abs_xls] = content_hash
+        # unchanged in the last build of a long-running manifest means nothing now
+        self._unchanged.discard(abs_xls)
+
+        entry = self._entries.get(abs_xls)
+        sheet_results = None
+        if entry is not None and entry.get('hash') == content_hash:
+            sheet_results = self._load_sheet_results(abs_xls)
+
+        if sheet_results is None:
+            # outputs are collected again while the xls is parsed, streamed ones may be exported before it is stored
+            if entry is not None:
+                self._stale_outputs.setdefault(abs_xls, []).extend(entry.get('outputs', []))
+            self._entries[abs_xls] = {'hash': None, 'outputs': []}
+            return None
+
+        self._unchanged.add(abs_xls)
+        return [sheet_result for _, _, sheet_result in sheet_results]
+
+    def load_sheet_cache(self, xls_path: str) -> dict:
+        """
+        sheet results of the last build, regardless of xls content hash
+        :param xls_path: xls file path
+        :return: sheet name => [fingerprint, [bool, table_or_err]]
+        """
+        sheet_results = self._load_sheet_results(os.path.abspath(xls_path)) or []
+        return {sheet_name: [fingerprint, sheet_result] for sheet_name, fingerprint, sheet_result in sheet_results}
+
+    def store_parse_result(self, xls_path: str, sheet_results: list):
+        """
+        :param xls_path: xls file path
+        :param sheet_results: list of [sheet_name, fingerprint, [bool, table_or_err]]
+        """
+        abs_xls = os.path.abspath(xls_path)
+        content_hash = self._hashes.get(abs_xls) or self._content_hash(abs_xls)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._cache_path(abs_xls), 'wb') as cache_file:
+            pickle.dump(sheet_results, cache_file, pickle.HIGHEST_PROTOCOL)
+        if self.warm:
+            self._sheet_results[abs_xls] = sheet_results
+
+        # outputs of the xls were reset by load_parse_result
+        entry = self._entries.setdefault(abs_xls, {'hash': None, 'outputs': []})
+        entry['hash'] = content_hash
+        self._unchanged.discard(abs_xls)
+
+    def is_unchanged(self, xls_path: str) -> bool:
+        return os.path.abspath(xls_path) in self._unchanged
+
+    def is_exported(self, xls_path: str, output_path: str) -> bool:
+        """
+        output of an unchanged xls is still on disk, no need to export again
+        """
+        entry = self._entries.get(os.path.abspath(xls_path))
+        abs_output = os.path.abspath(output_path)
+        return self.is_unchanged(xls_path) and entry is not None and abs_output in entry['outputs'] \
+            and os.path.exists(abs_output)
+
+    def add_output(self, xls_path: str, output_path: str):
+        entry = self._entries.get(os.path.abspath(xls_path))
+        abs_output = os.path.abspath(output_path)
+        if entry is not None and abs_output not in entry['outputs']:
+            entry['outputs'].append(abs_output)
+
+    def _content_hash(self, abs_xls: str) -> str:
+        if not self.warm:
+            return file_content_hash(abs_xls)
+
+        # an xls saved again always gets a new mtime, hash only those
+        stat = os.stat(abs_xls)
+        cached_stat = self._stats.get(abs_xls)
+        if cached_stat is not None and cached_stat[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return cached_stat[2]
+
+        content_hash = file_content_hash(abs_xls)
+        self._stats[abs_xls] = [stat.st_mtime_ns, stat.st_size, content_hash]
+        return content_hash
+
+    def _load_sheet_results(self, abs_xls: str):
+        if abs_xls in self._sheet_results:
+            return self._sheet_results[abs_xls]
+
+        cache_path = self._cache_path(abs_xls)
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                sheet_results = pickle.load(cache_file)
+        except Exception as err:
+            debug_log(f'parse cache of {abs_xls} is unusable, {err}')
+            return None
+
+        if self.warm:
+            self._sheet_results[abs_xls] = sheet_results
+        return sheet_results
+
+    def _cache_path(self, abs_xls: str) -> str:
+        path_hash = hashlib.md5(abs_xls.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{path_hash}.pickle')
+
+    @staticmethod
+    def _remove_files(file_paths: list):
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                os.remove(file_path)
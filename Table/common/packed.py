@@ -0,0 +1,19 @@
+import pickle
+
+from .columnar import ColumnarTable
+from .table import Table
+
+
+def pack_table(table: Table) -> bytes:
+    """
+    pack table to one flat blob, cheap to send between processes
+    header: plain field tuples, body: typed column arrays instead of a Row object graph
+    """
+    return pickle.dumps(ColumnarTable.from_table(table), pickle.HIGHEST_PROTOCOL)
+
+
+def unpack_table(blob: bytes) -> ColumnarTable:
+    """
+    rebuild table from blob, pickle copies the column bytes out of it, int columns are views over those copies
+    """
+    return pickle.loads(blob)
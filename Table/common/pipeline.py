@@ -1,26 +1,64 @@
 from . import stage
+from . import xls
+from .manifest import BuildManifest
 
 
 class Pipeline:
-    _Stages = []
-
-    def __init__(self, name):
+    def __init__(self, name, streaming=False):
+        """
+        :param name: pipeline name
+        :param streaming: stages after the first one take and yield items one by one,
+            so parse, export and proto gen of different tables overlap
+        """
         self.name = name
+        self.streaming = streaming
+        self._Stages = []
 
     def add_stage(self, one_stage: stage.Stage):
         self._Stages.append(one_stage)
 
     def execute(self, param):
+        if self.streaming:
+            return self._execute_streaming(param)
+
         next_parm = param
         for one_stage in self._Stages:
             next_parm = one_stage.execute(next_parm)
 
+    def _execute_streaming(self, param):
+        if not self._Stages:
+            return
+
+        # first stage turns the pipeline param into items, e.g. xls dir to xls files
+        items = self._Stages[0].execute(param) or []
+        for one_stage in self._Stages[1:]:
+            items = one_stage.stream(items)
+
+        # pull items through all stages
+        for _ in items:
+            pass
 
-def new_pipeline():
-    pipeline_instance = Pipeline("common pipeline")
-    pipeline_instance.add_stage(stage.CollectXlsStage("Collect Xls", ["*.xlsx", "*.xlsm"]))
-    pipeline_instance.add_stage(stage.ParseXlsStage("Xls To Table"))
-    pipeline_instance.add_stage(stage.CSVExportStage("CSV Export", "./"))
+    def close(self):
+        for one_stage in self._Stages:
+            one_stage.close()
+
+
+def new_pipeline(csv_dir='./', temp_dir=None, incremental=False, streaming=False, xml_backend=None):
+    """
+    :param csv_dir: csv export dir
+    :param temp_dir: intermediate files dir, incremental build manifest is saved here
+    :param incremental: only parse and export changed xls
+    :param streaming: export each table as soon as it is parsed
+    :param xml_backend: xlsx sheet xml parser, 'etree', 'lxml' or 'expat', xlrd default if None
+    """
+    manifest = BuildManifest(temp_dir) if incremental and temp_dir else None
+
+    pipeline_instance = Pipeline("common pipeline", streaming)
+    pipeline_instance.add_stage(stage.CollectXlsStage(xls.XlsFilePatterns))
+    pipeline_instance.add_stage(stage.ParseXlsStage(manifest, xml_backend))
+    pipeline_instance.add_stage(stage.CSVExportStage(csv_dir, manifest))
+    if manifest is not None:
+        pipeline_instance.add_stage(stage.SaveManifestStage(manifest))
     # pipeline_instance.add_stage(stage.MultipleExportStage('Table to CSV', [
     #     stage.CSVExportSetting('Client', './client', Tag.Client, _tag_compatible),
     #     stage.CSVExportSetting('Server', './server', Tag.Server, _tag_compatible)
@@ -29,20 +67,56 @@ def new_pipeline():
     return pipeline_instance
 
 
+def new_watch_pipeline(csv_dir, temp_dir, proto_dir=None, xml_backend=None):
+    """
+    pipeline executed again on every xls change by a long-running build, see watch.WatchBuild
+    parse processes and parsed tables stay warm between executes, only changed xls are parsed and exported
+    :param csv_dir: csv export dir
+    :param temp_dir: intermediate files dir, incremental build manifest is saved here
+    :param proto_dir: proto output dir, no proto if None
+    :param xml_backend: xlsx sheet xml parser, see new_pipeline
+    """
+    manifest = BuildManifest(temp_dir, warm=True)
+
+    pipeline_instance = Pipeline('watch pipeline', streaming=True)
+    pipeline_instance.add_stage(stage.CollectXlsStage(xls.XlsFilePatterns))
+    pipeline_instance.add_stage(stage.ParseXlsStage(manifest, xml_backend, keep_pool=True))
+    pipeline_instance.add_stage(stage.CSVExportStage(csv_dir, manifest))
+    if proto_dir:
+        pipeline_instance.add_stage(stage.ParseProtoStage(proto_dir, manifest))
+    pipeline_instance.add_stage(stage.SaveManifestStage(manifest))
+
+    return pipeline_instance
+
+
+def new_proto_pipeline(proto_dir, xml_backend=None):
+    """
+    generate .proto of every sheet from its header only
+    :param proto_dir: proto output dir
+    :param xml_backend: xlsx sheet xml parser, see new_pipeline
+    """
+    pipeline_instance = Pipeline('proto pipeline', streaming=True)
+    pipeline_instance.add_stage(stage.CollectXlsStage(xls.XlsFilePatterns))
+    pipeline_instance.add_stage(stage.ProbeSchemaStage(xml_backend))
+    pipeline_instance.add_stage(stage.ParseProtoStage(proto_dir))
+
+    return pipeline_instance
+
+
 def new_single_sheet_pipeline(sheet_name: str):
     pipeline_instance = Pipeline('single sheet pipeline')
-    pipeline_instance.add_stage(stage.SingleXlsStage('single xls stage'))
-    pipeline_instance.add_stage(stage.ParseSingleSheetStage('Parse single sheet', sheet_name))
-    pipeline_instance.add_stage(stage.PrintTableStage('Print'))
+    pipeline_instance.add_stage(stage.SingleXlsStage())
+    pipeline_instance.add_stage(stage.ParseSingleSheetStage(sheet_name))
+    pipeline_instance.add_stage(stage.PrintParsedResultTableStage())
 
     return pipeline_instance
 
 
 def new_single_xls_pipeline():
     pipeline_instance = Pipeline('Single Xls pipeline')
-    pipeline_instance.add_stage(stage.SingleXlsStage('single xls stage'))
-    pipeline_instance.add_stage(stage.ParseXlsStage('Parse xls list'))
-    pipeline_instance.add_stage(stage.PrintTableStage('Print'))
+    pipeline_instance.add_stage(stage.SingleXlsStage())
+    pipeline_instance.add_stage(stage.ParseXlsStage())
+    pipeline_instance.add_stage(stage.PrintParsedResultTableStage())
 
     return pipeline_instance
 
@@ -0,0 +1,258 @@
+import json
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import xls
+from . import xlrd
+from .log import debug_log
+from .log import info_log
+
+
+class CachedWorkbook:
+    """
+    An xlsx opened from its bytes, the file is not held open, so the designer can save it again at any time
+    """
+
+    def __init__(self, key, book, fingerprints: dict):
+        """
+        :param key: (mtime_ns, size) of the xls file the book is opened from
+        :param book: xlrd Book opened on demand, sheets are read as they are previewed
+        :param fingerprints: sheet name => fingerprint, see xlrd.sheet_fingerprints
+        """
+        self.key = key
+        self.book = book
+        self.fingerprints = fingerprints
+        # sheet name => [fingerprint, json response bytes]
+        self.responses = {}
+
+
+class WorkbookCache:
+    """
+    Opened workbooks and preview responses of their sheets, keyed by xls (path, mtime, size)
+    a saved workbook is opened again, sheets whose fingerprint is unchanged keep their response
+    """
+    # most recently previewed workbooks kept open
+    MaxWorkbooks = 8
+
+    def __init__(self, xml_backend=None, max_workbooks=MaxWorkbooks):
+        """
+        :param xml_backend: xlsx sheet xml parser, see XlsParser
+        :param max_workbooks: least recently previewed workbooks beyond this are released
+        """
+        self.parser = xls.XlsParser(columnar=True, xml_backend=xml_backend)
+        self.max_workbooks = max_workbooks
+        # xls abs path => CachedWorkbook, least recently previewed first
+        self._workbooks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def preview_sheet(self, xls_path: str, sheet_name: str) -> list:
+        """
+        :param xls_path: xls file path
+        :param sheet_name: sheet name
+        :return: [json response bytes, bool cached], responses are of xls abs path
+        """
+        abs_xls = os.path.abspath(xls_path)
+        with self._lock:
+            try:
+                workbook = self._open_workbook(abs_xls)
+            except Exception as err:
+                # e.g. caught in the middle of saving, opened again by next preview
+                broken = self._workbooks.pop(abs_xls, None)
+                if broken is not None:
+                    broken.book.release_resources()
+                return [_error_response(abs_xls, sheet_name, err), False]
+
+            fingerprint = workbook.fingerprints.get(sheet_name)
+            cached = workbook.responses.get(sheet_name)
+            if cached is not None and fingerprint is not None and cached[0] == fingerprint:
+                return [cached[1], True]
+
+            response = self._parse_sheet(workbook, abs_xls, sheet_name)
+            workbook.responses[sheet_name] = [fingerprint, response]
+            return [response, False]
+
+    def close(self):
+        with self._lock:
+            for workbook in self._workbooks.values():
+                workbook.book.release_resources()
+            self._workbooks.clear()
+
+    def _open_workbook(self, abs_xls: str) -> CachedWorkbook:
+        """
+        :return: cached workbook of the current xls content, opened again if xls mtime or size changed
+        """
+        xls_stat = os.stat(abs_xls)
+        workbook = self._workbooks.get(abs_xls)
+        if workbook is not None and workbook.key == (xls_stat.st_mtime_ns, xls_stat.st_size):
+            self._workbooks.move_to_end(abs_xls)
+            return workbook
+
+        # non blocking, a fifo put in place of the xls must not hang every preview behind the lock
+        fd = os.open(abs_xls, os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_NONBLOCK', 0))
+        with os.fdopen(fd, 'rb') as xls_file:
+            xls_stat = os.fstat(xls_file.fileno())
+            if not stat.S_ISREG(xls_stat.st_mode):
+                raise ValueError(f'{abs_xls} is not a regular file')
+            # never more than the size of the file opened, e.g. a device file
+            contents = xls_file.read(xls_stat.st_size)
+        key = (xls_stat.st_mtime_ns, xls_stat.st_size)
+        book = xlrd.open_workbook(file_contents=contents, on_demand=True, values_only=True,
+                                  lazy_shared_strings=True, xml_backend=self.parser.xml_backend)
+        # None for xls, its sheets are parsed on every open
+        fingerprints = xlrd.sheet_fingerprints(file_contents=contents) or {}
+        new_workbook = CachedWorkbook(key, book, fingerprints)
+
+        if workbook is not None:
+            workbook.book.release_resources()
+            # responses of unchanged sheets survive the save
+            for sheet_name, cached in workbook.responses.items():
+                if cached[0] is not None and cached[0] == fingerprints.get(sheet_name):
+                    new_workbook.responses[sheet_name] = cached
+            del self._workbooks[abs_xls]
+
+        self._workbooks[abs_xls] = new_workbook
+        while len(self._workbooks) > self.max_workbooks:
+            _, evicted = self._workbooks.popitem(last=False)
+            evicted.book.release_resources()
+
+        return new_workbook
+
+    def _parse_sheet(self, workbook: CachedWorkbook, xls_path: str, sheet_name: str) -> bytes:
+        if not xls.is_valid_xls_sheet(sheet_name):
+            return _error_response(xls_path, sheet_name, f'{sheet_name} is not a valid export table name')
+
+        try:
+            rs, table_or_err = self.parser.parse_book_sheet(xls_path, workbook.book, sheet_name)
+        except Exception as err:
+            rs, table_or_err = [False, err]
+
+        if not rs:
+            return _error_response(xls_path, sheet_name, table_or_err)
+
+        fields = [{'name': field.field_name, 'type': field.data_type.to_csv_str(), 'tag': field.tag.to_str(),
+                   'primary': field.primary} for field in table_or_err.header.get_fields()]
+        return _json_bytes({'ok': True, 'xls': xls_path, 'sheet': sheet_name, 'fields': fields,
+                            'rows': table_or_err.content_rows()})
+
+
+def _error_response(xls_path, sheet_name, err) -> bytes:
+    return _json_bytes({'ok': False, 'xls': xls_path, 'sheet': sheet_name, 'error': str(err)})
+
+
+def _json_bytes(response: dict) -> bytes:
+    return json.dumps(response, ensure_ascii=False).encode('utf-8')
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /sheet?xls_path=...&sheet_name=... => parsed table or validation error as json
+    """
+    # keep-alive, a designer tool saves a connect per preview
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written apart, nagle would hold the body until the delayed ack of the client
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        start_time = time.time()
+        # a web page whose host name rebinds to this address sends its own host name
+        if not self.server.is_bound_host(self.headers.get('Host')):
+            self._reply(403, _json_bytes({'ok': False, 'error': f'host {self.headers.get("Host")} is not allowed'}))
+            return
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        xls_path = params.get('xls_path', [None])[0]
+        sheet_name = params.get('sheet_name', [None])[0]
+
+        if url.path != '/sheet':
+            self._reply(404, _json_bytes({'ok': False, 'error': f'unknown path {url.path}'}))
+            return
+        if not xls_path or not sheet_name:
+            self._reply(400, _json_bytes({'ok': False, 'error': 'xls_path and sheet_name are required'}))
+            return
+        status, abs_xls_or_err = self.server.resolve_xls_path(xls_path)
+        if 200 != status:
+            self._reply(status, _error_response(xls_path, sheet_name, abs_xls_or_err))
+            return
+
+        response, cached = self.server.workbook_cache.preview_sheet(abs_xls_or_err, sheet_name)
+        self._reply(200, response)
+        info_log(f'preview {xls_path} {sheet_name}{" (cached)" if cached else ""} '
+                 f'elapse {(time.time() - start_time) * 1000:.1f} ms')
+
+    def _reply(self, status, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # every preview is logged by do_GET already
+        pass
+
+
+class PreviewServer(ThreadingHTTPServer):
+    """
+    Local http server previewing single sheets in a warm process, see PreviewRequestHandler
+    only xls the build collects from xls dir are opened, requests must name the bound address as their host
+    """
+    daemon_threads = True
+
+    def __init__(self, xls_dir, host='127.0.0.1', port=8765, xml_backend=None):
+        """
+        :param xls_dir: xls input dir, xls_path of requests is resolved under it
+        :param host: listen address
+        :param port: listen port, any free port if 0
+        :param xml_backend: xlsx sheet xml parser, see XlsParser
+        """
+        super().__init__((host, port), PreviewRequestHandler)
+        self.xls_dir = os.path.normcase(os.path.realpath(xls_dir))
+        self.workbook_cache = WorkbookCache(xml_backend)
+
+        bound_address, bound_port = self.server_address[:2]
+        self.bound_hosts = {f'{host}:{bound_port}'.lower(), f'{bound_address}:{bound_port}'}
+        if bound_address.startswith('127.'):
+            self.bound_hosts.add(f'localhost:{bound_port}')
+
+    def is_bound_host(self, host_header) -> bool:
+        """
+        :param host_header: Host header of a request, None if missing
+        """
+        return host_header is not None and host_header.lower() in self.bound_hosts
+
+    def resolve_xls_path(self, xls_path: str) -> list:
+        """
+        :param xls_path: xls path of a request, absolute or relative to xls dir
+        :return: [http status, abs xls path or err], 200 only for a regular xls file collected from xls dir
+        """
+        # symlinks are resolved too, a link in xls dir may not lead out of it
+        abs_xls = os.path.normcase(os.path.realpath(os.path.join(self.xls_dir, xls_path)))
+        if os.path.dirname(abs_xls) != self.xls_dir or \
+                not xls.is_collected_xls_name(os.path.basename(abs_xls), xls.XlsFilePatterns):
+            return [400, f'{xls_path} is not an xls of {self.xls_dir}']
+
+        try:
+            xls_stat = os.stat(abs_xls)
+        except OSError:
+            return [404, f'xls file {xls_path} is not exists']
+        if not stat.S_ISREG(xls_stat.st_mode):
+            return [400, f'{xls_path} is not a regular file']
+
+        return [200, abs_xls]
+
+    def run(self):
+        info_log(f'preview server of {self.xls_dir} on http://{self.server_address[0]}:{self.server_address[1]}/sheet, '
+                 f'ctrl-c to stop')
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            debug_log('preview server stopped')
+        finally:
+            self.server_close()
+            self.workbook_cache.close()
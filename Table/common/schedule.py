@@ -0,0 +1,62 @@
+from .log import info_log
+
+
+class CostScheduler:
+    """
+    Longest processing time first scheduling of estimated cost tasks
+    tiny tasks are packed into batches, so they don't pay process communication one by one
+    """
+    # about how many batches each worker takes, more batches balance better, fewer batches cost less ipc
+    BatchesPerWorker = 4
+
+    def __init__(self, worker_count: int):
+        self.worker_count = max(1, worker_count)
+
+    def schedule(self, costs: list) -> list:
+        """
+        :param costs: estimated cost of each task
+        :return: batches of task indices, most expensive batch first
+        """
+        if not costs:
+            return []
+
+        batch_cost_limit = sum(costs) / (self.worker_count * self.BatchesPerWorker)
+
+        batches = []
+        small_batch = []
+        small_batch_cost = 0
+        for task_index in sorted(range(len(costs)), key=lambda index: costs[index], reverse=True):
+            cost = costs[task_index]
+            if cost >= batch_cost_limit:
+                batches.append([cost, [task_index]])
+                continue
+
+            if small_batch and small_batch_cost + cost > batch_cost_limit:
+                batches.append([small_batch_cost, small_batch])
+                small_batch = []
+                small_batch_cost = 0
+
+            small_batch.append(task_index)
+            small_batch_cost += cost
+
+        if small_batch:
+            batches.append([small_batch_cost, small_batch])
+
+        batches.sort(key=lambda batch: batch[0], reverse=True)
+        return [task_indices for _, task_indices in batches]
+
+    def report_makespan(self, name: str, batch_elapses: list, wall_elapse: float):
+        """
+        log how close the actual makespan is to the ideal one
+        ideal makespan: total work evenly spread over workers, but never shorter than the longest batch
+        :param name: scheduled job name
+        :param batch_elapses: measured elapse of each batch
+        :param wall_elapse: measured elapse of the whole job
+        """
+        if not batch_elapses or wall_elapse <= 0:
+            return
+
+        ideal_makespan = max(sum(batch_elapses) / self.worker_count, max(batch_elapses))
+        info_log(f'{name}: {len(batch_elapses)} batches on {self.worker_count} workers, '
+                 f'makespan {wall_elapse:.3f}s, ideal {ideal_makespan:.3f}s, '
+                 f'efficiency {ideal_makespan / wall_elapse:.0%}')
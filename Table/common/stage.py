@@ -1,14 +1,21 @@
+import itertools
 import os
+import pickle
 import sys
 import time
 from multiprocessing import Pool
 from multiprocessing import cpu_count
 
 from . import xls
-from .elem import TabPrimitive, TabArray, StrElemClass
+from . import xlrd
+from .columnar import ColumnarTable
+from .elem import TabPrimitive, TabArray, StrElemClass, shared_parse_cache
 from .log import debug_log
 from .log import info_log
+from .manifest import BuildManifest
+from .packed import pack_table, unpack_table
 from .proto_type_assembler import ProtoTypeAssembler
+from .schedule import CostScheduler
 from .row import Row, RowSemantic
 from .table import Header, Table, TableDataUtil
 
@@ -22,6 +29,23 @@ class Stage:
     def execute(self, param):
         pass
 
+    def stream(self, items):
+        """
+        streaming version of execute, take items one by one and yield results one by one
+        stages not overriding it wait for all items, then execute at once
+        :param items: iterator of the previous stage outputs
+        :return: iterator of outputs
+        """
+        outputs = self.execute(list(items))
+        if outputs:
+            yield from outputs
+
+    def close(self):
+        """
+        release resources kept between executes of a long-running pipeline
+        """
+        pass
+
 
 class SingleXlsStage(Stage):
     def __init__(self):
@@ -74,74 +98,459 @@ class CollectXlsStage(Stage):
 
 
 class ParseXlsStage(Stage):
-    def __init__(self):
+    # xlsx sheets with more xml than twice this are split into chunks parsed by several processes
+    SheetChunkSize = 8 * 1024 * 1024
+
+    def __init__(self, manifest: BuildManifest = None, xml_backend=None, keep_pool=False):
+        """
+        Parse xls files
+        :param manifest: incremental build manifest, unchanged xls reuse cached parse results
+        :param xml_backend: xlsx sheet xml parser, see XlsParser
+        :param keep_pool: keep parse processes alive between executes, for a long-running build, see close
+        """
         super().__init__('ParseXlsArray')
         self._tables = []
+        self.manifest = manifest
+        self.xml_backend = xml_backend
+        self.keep_pool = keep_pool
+        self._pool = None
 
     def execute(self, xls_list) -> list:
         """
         Parse xls file sheet to Table
         :param xls_list: input xls files' path
-        :return: all Tables list of [bool, table_or_err]
+        :return: all Tables list of [bool, table_or_err], in xls and sheet order
         """
-        start_time = time.time()
-        parsed_tables = []
+        ordered_results = sorted(self._parse_xls_list(xls_list), key=lambda ordered_result: ordered_result[:2])
+        return [sheet_result for _, _, sheet_result in ordered_results]
+
+    def stream(self, xls_list):
+        """
+        Parse xls file sheet to Table, each sheet is yielded as soon as it is parsed
+        :param xls_list: input xls files' path
+        :return: iterator of [bool, table_or_err], in parse completion order
+        """
+        for _, _, sheet_result in self._parse_xls_list(xls_list):
+            yield sheet_result
 
-        xls_list_len = len(xls_list)
+    def _parse_xls_list(self, xls_list):
+        """
+        :return: iterator of [xls_order, sheet_order, [bool, table_or_err]], in parse completion order
+        """
+        start_time = time.time()
+        xls_list = list(xls_list)
+        changed_xls_orders = range(len(xls_list))
+
+        if self.manifest is not None:
+            self.manifest.sync(xls_list)
+            changed_xls_orders = []
+            for xls_order, xls_path in enumerate(xls_list):
+                cached_result = self.manifest.load_parse_result(xls_path)
+                if cached_result is None:
+                    changed_xls_orders.append(xls_order)
+                else:
+                    for sheet_order, sheet_result in enumerate(cached_result):
+                        yield [xls_order, sheet_order, sheet_result]
+
+            info_log(f'{len(xls_list) - len(changed_xls_orders)} xls unchanged, '
+                     f'{len(changed_xls_orders)} xls to parse')
+
+        xls_tasks = []
+        sheet_caches = []
+        for xls_order in changed_xls_orders:
+            xls_path = xls_list[xls_order]
+            sheet_cache = self.manifest.load_sheet_cache(xls_path) if self.manifest is not None else {}
+            cached_fingerprints = {sheet_name: cached[0] for sheet_name, cached in sheet_cache.items()}
+            xls_tasks.append([xls_path, cached_fingerprints])
+            sheet_caches.append(sheet_cache)
+
+        xls_results, sheet_tasks, task_costs, shared_strings = self._plan_sheet_tasks(xls_tasks, sheet_caches)
+
+        pending_counts = [0] * len(xls_tasks)
+        for sheet_task in sheet_tasks:
+            pending_counts[sheet_task[0]] += 1
+        # (xls_index, sheet_index) => results of chunks of a split sheet, joined when all are parsed
+        chunk_results = {}
+
+        # unchanged sheets of changed xls are ready
+        for xls_index, sheet_results in enumerate(xls_results):
+            for sheet_order, sheet_result in enumerate(sheet_results):
+                if sheet_result[2] is not None:
+                    yield [changed_xls_orders[xls_index], sheet_order, sheet_result[2]]
+
+            if 0 == pending_counts[xls_index]:
+                self._store_xls_result(xls_tasks[xls_index][0], sheet_results)
+
+        for task_index, task_result in self._run_sheet_tasks(sheet_tasks, task_costs, shared_strings, self.xml_backend,
+                                                             self._kept_pool(len(sheet_tasks))):
+            xls_index, sheet_index, _, _, chunk = sheet_tasks[task_index]
+            xls_order = changed_xls_orders[xls_index]
+            pending_counts[xls_index] -= 1
+
+            if chunk is not None:
+                chunk_index, chunk_count, _ = chunk
+                sheet_chunk_results = chunk_results.setdefault((xls_index, sheet_index), [None] * chunk_count)
+                sheet_chunk_results[chunk_index] = task_result
+                if any(chunk_result is None for chunk_result in sheet_chunk_results):
+                    continue
+                task_result = xls.XlsParser.join_chunk_results(chunk_results.pop((xls_index, sheet_index)))
+
+            if sheet_index < 0:
+                xls_results[xls_index] = task_result
+                for sheet_order, sheet_result in enumerate(task_result):
+                    yield [xls_order, sheet_order, sheet_result[2]]
+            else:
+                xls_results[xls_index][sheet_index][2] = task_result
+                yield [xls_order, sheet_index, task_result]
 
-        if xls_list_len > 1:
-            parsed_tables = self._multi_process_parse_xls_files(xls_list)
-        elif 1 == xls_list_len:
-            single_xls_path = xls_list[0]
-            parsed_tables = self.parse_one_xls(single_xls_path)
+            if 0 == pending_counts[xls_index]:
+                self._store_xls_result(xls_tasks[xls_index][0], xls_results[xls_index])
 
         info_log(f'parse all xls elapse {time.time() - start_time} seconds')
-        return parsed_tables
 
-    def _multi_process_parse_xls_files(self, xls_list):
-        thread_count = cpu_count()
+    def _store_xls_result(self, xls_path, sheet_results):
+        if self.manifest is not None:
+            self.manifest.store_parse_result(xls_path, sheet_results)
 
-        with Pool(thread_count) as pool:
-            rs = pool.map(self.parse_one_xls, xls_list)
+    def _kept_pool(self, task_count):
+        """
+        :return: pool kept between executes, created on first use, None if not kept or tasks run in this process
+        """
+        if not self.keep_pool or task_count <= 1:
+            return None
 
-        parsed_tables = []
+        if self._pool is None:
+            start_time = time.time()
+            self._pool = Pool(cpu_count(), initializer=_init_parse_worker, initargs=(self.xml_backend,))
+            debug_log(f'parse pool of {cpu_count()} processes started, elapse {time.time() - start_time} seconds')
+        return self._pool
 
-        for one_xls_result in rs:
-            for sheet_result in one_xls_result:
-                rs, table_or_err = sheet_result
-                if rs:
-                    parsed_tables.append(table_or_err)
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    @staticmethod
+    def _plan_sheet_tasks(xls_tasks, sheet_caches):
+        """
+        split xlsx into [xls, sheet] tasks, sheets of one big xls spread over all processes
+        a sheet too big for one process is split into chunk tasks at row boundaries
+        :param xls_tasks: list of [xls_path, cached sheet fingerprints]
+        :param sheet_caches: sheet cache of each xls, see BuildManifest.load_sheet_cache
+        :return: [sheet results of each xls, sheet tasks, estimated cost of each task, xls path => shared strings]
+          shared strings of xlsx with several changed sheets are parsed once, sent with the batches of their sheets
+          unchanged sheets reuse tables of last build, results of sheets to parse are None
+          sheet task is [xls_index, sheet_index, xls_path, sheet_name, chunk], chunk is None for a whole sheet,
+          [chunk_index, chunk_count, chunk_xml] for a chunk of a split sheet
+        """
+        xls_results = []
+        sheet_tasks = []
+        # estimated cost: uncompressed sheet xml size, file size for xls
+        task_costs = []
+        shared_strings = {}
+        process_count = cpu_count()
+
+        for xls_index, xls_task in enumerate(xls_tasks):
+            xls_path, cached_fingerprints = xls_task
+            export_fingerprints = xls.XlsParser.export_sheet_fingerprints(xls_path)
+
+            # xls, no sheet granularity, parse whole xls in one task
+            if export_fingerprints is None:
+                xls_results.append([])
+                sheet_tasks.append([xls_index, -1, xls_path, None, None])
+                task_costs.append(os.path.getsize(xls_path))
+                continue
+
+            sheet_results = []
+            changed_sheet_count = 0
+            for sheet_name, fingerprint in export_fingerprints:
+                if cached_fingerprints.get(sheet_name) != fingerprint:
+                    sheet_index = len(sheet_results)
+                    chunks = ParseXlsStage._split_sheet(xls_path, sheet_name, fingerprint[1], process_count)
+                    if chunks is None:
+                        sheet_tasks.append([xls_index, sheet_index, xls_path, sheet_name, None])
+                        task_costs.append(fingerprint[1])
+                        changed_sheet_count += 1
+                    else:
+                        # not counted, chunks decode only the shared strings they use,
+                        # parsing the whole table first would hold every chunk back
+                        for chunk_index, (_, chunk_xml) in enumerate(chunks):
+                            sheet_tasks.append([xls_index, sheet_index, xls_path, sheet_name,
+                                                [chunk_index, len(chunks), chunk_xml]])
+                            task_costs.append(len(chunk_xml))
+                    sheet_results.append([sheet_name, fingerprint, None])
                 else:
-                    info_log(table_or_err)
+                    sheet_results.append([sheet_name, fingerprint, sheet_caches[xls_index][sheet_name][1]])
+            xls_results.append(sheet_results)
+
+            # shared strings parsed once here, instead of once per sheet task
+            if changed_sheet_count > 1:
+                shared_strings[xls_path] = xlrd.load_shared_strings(os.path.abspath(xls_path))
+
+        return [xls_results, sheet_tasks, task_costs, shared_strings]
+
+    @staticmethod
+    def _split_sheet(xls_path, sheet_name, sheet_size, process_count):
+        """
+        split sheet xml into one chunk per process, at least SheetChunkSize each
+        :param sheet_size: uncompressed sheet xml size
+        :return: chunks of xlrd.split_sheet_xml, None if sheet is parsed as a whole
+        """
+        if process_count <= 1 or sheet_size < 2 * ParseXlsStage.SheetChunkSize:
+            return None
+
+        start_time = time.time()
+        chunk_size = max(ParseXlsStage.SheetChunkSize, sheet_size // process_count + 1)
+        chunks = xlrd.split_sheet_xml(os.path.abspath(xls_path), sheet_name=sheet_name, chunk_size=chunk_size,
+                                      lead_rows=xls.XlsParser.ContentStartRow)
+        if len(chunks) <= 1:
+            return None
+
+        debug_log(f'{xls_path} {sheet_name} split into {len(chunks)} chunks, '
+                  f'elapse {time.time() - start_time} seconds')
+        return chunks
+
+    @staticmethod
+    def _run_sheet_tasks(sheet_tasks, task_costs, shared_strings, xml_backend=None, pool=None):
+        """
+        most expensive tasks are dispatched first, so a big sheet picked up last never becomes the critical path
+        :param shared_strings: xls path => shared strings, pickled once, each batch only takes those of its own
+          whole sheet tasks, a process unpickles each of them once
+        :param pool: kept parse pool, its processes are already initialized, a pool for these tasks only if None
+        :return: iterator of [task_index, task_result], in completion order
+        """
+        if len(sheet_tasks) <= 1:
+            _init_parse_worker(xml_backend)
+            start_counters = shared_parse_cache.counters()
+            for task_index, sheet_task in enumerate(sheet_tasks):
+                yield [task_index, ParseXlsStage.parse_sheet_task(sheet_task, shared_strings)]
+            _report_parse_cache(_parse_cache_delta(start_counters))
+            return
+
+        thread_count = min(cpu_count(), len(sheet_tasks))
+        scheduler = CostScheduler(thread_count)
+        pickled_shared_strings = {xls_path: pickle.dumps(xls_shared_strings, pickle.HIGHEST_PROTOCOL)
+                                  for xls_path, xls_shared_strings in shared_strings.items()}
+        # processes of a kept pool drop shared strings of earlier runs
+        run_token = next(_run_tokens)
+        indexed_batches = []
+        for task_indices in scheduler.schedule(task_costs):
+            batch = [sheet_tasks[task_index] for task_index in task_indices]
+            batch_shared_strings = {sheet_task[2]: pickled_shared_strings[sheet_task[2]] for sheet_task in batch
+                                    if sheet_task[4] is None and sheet_task[2] in pickled_shared_strings}
+            indexed_batches.append([task_indices, batch, [run_token, batch_shared_strings]])
+
+        batch_elapses = []
+        cache_hits_misses = [0, 0]
+        start_time = time.time()
+
+        if pool is None:
+            with Pool(thread_count, initializer=_init_parse_worker, initargs=(xml_backend,)) as pool:
+                batch_outputs = pool.imap_unordered(ParseXlsStage.parse_sheet_batch, indexed_batches)
+                yield from ParseXlsStage._collect_batches(batch_outputs, batch_elapses, cache_hits_misses)
+        else:
+            batch_outputs = pool.imap_unordered(ParseXlsStage.parse_sheet_batch, indexed_batches)
+            yield from ParseXlsStage._collect_batches(batch_outputs, batch_elapses, cache_hits_misses)
 
-        return parsed_tables
+        scheduler.report_makespan('parse sheets', batch_elapses, time.time() - start_time)
+        _report_parse_cache(cache_hits_misses)
+
+    @staticmethod
+    def _collect_batches(batch_outputs, batch_elapses, cache_hits_misses):
+        """
+        :param batch_outputs: iterator of parse_sheet_batch outputs
+        :param batch_elapses: elapse of each batch is appended
+        :param cache_hits_misses: [hits, misses] of parse cache, summed in place
+        :return: iterator of [task_index, task_result]
+        """
+        for batch_indices, batch_results, batch_elapse, batch_hits_misses in batch_outputs:
+            batch_elapses.append(batch_elapse)
+            cache_hits_misses[0] += batch_hits_misses[0]
+            cache_hits_misses[1] += batch_hits_misses[1]
+            for task_index, task_result in zip(batch_indices, batch_results):
+                yield [task_index, _unpack_task_result(task_result)]
 
     @staticmethod
-    def parse_one_xls(xls_file_path: str) -> list:
-        parser = xls.XlsParser()
-        return parser.parse_one_xls(xls_file_path)
+    def parse_sheet_batch(indexed_batch):
+        """
+        :param indexed_batch: [task indices, sheet tasks, [run token, xls path => pickled shared strings of the tasks]]
+        :return: [task indices, results of sheet tasks, batch elapse, [parse cache hits, misses] of batch]
+        """
+        start_time = time.time()
+        start_counters = shared_parse_cache.counters()
+        task_indices, batch, pickled_shared_strings = indexed_batch
+        shared_strings = _worker_shared_strings(*pickled_shared_strings)
+        # tables are sent back packed, far cheaper to pickle than Row object graphs
+        batch_results = [_pack_task_result(ParseXlsStage.parse_sheet_task(sheet_task, shared_strings))
+                         for sheet_task in batch]
+        return [task_indices, batch_results, time.time() - start_time, _parse_cache_delta(start_counters)]
+
+    @staticmethod
+    def parse_sheet_task(sheet_task, shared_strings=None):
+        """
+        :param sheet_task: [xls_index, sheet_index, xls_path, sheet_name, chunk], sheet_name None parses the whole xls
+        :param shared_strings: xls path => shared strings parsed before, others are decoded as the sheet uses them
+        :return: [bool, table_or_err] of the sheet, sheet results of the xls if sheet_name is None,
+          [bool, table_or_err, body_rows] of a chunk, see XlsParser.parse_sheet_chunk
+        """
+        _, _, xls_file_path, sheet_name, chunk = sheet_task
+        parser = xls.XlsParser(columnar=True, xml_backend=_worker_xml_backend)
+        if sheet_name is None:
+            return parser.parse_xls_sheets(xls_file_path)
+
+        if chunk is not None:
+            return parser.parse_sheet_chunk(xls_file_path, sheet_name, chunk[2])
+
+        return list(parser.parse_one_sheet(xls_file_path, sheet_name, (shared_strings or {}).get(xls_file_path)))
+
+
+# xlsx sheet xml parser of XlsParser, set in every parse process by pool initializer
+_worker_xml_backend = None
+# token of each _run_sheet_tasks, tells a parse process which shared strings are still of the current run
+_run_tokens = itertools.count()
+# [run token, xls path => shared strings] unpickled by this parse process
+_worker_run_shared_strings = [None, {}]
+
+
+def _init_parse_worker(xml_backend=None):
+    global _worker_xml_backend
+    _worker_xml_backend = xml_backend
+
+
+def _worker_shared_strings(run_token, pickled_shared_strings):
+    """
+    :param pickled_shared_strings: xls path => pickled shared strings sent with a batch
+    :return: xls path => shared strings, each is unpickled once per run by a process, not for every batch
+    """
+    global _worker_run_shared_strings
+    if _worker_run_shared_strings[0] != run_token:
+        _worker_run_shared_strings = [run_token, {}]
+
+    run_shared_strings = _worker_run_shared_strings[1]
+    shared_strings = {}
+    for xls_path, pickled in pickled_shared_strings.items():
+        if xls_path not in run_shared_strings:
+            run_shared_strings[xls_path] = pickle.loads(pickled)
+        shared_strings[xls_path] = run_shared_strings[xls_path]
+    return shared_strings
+
+
+def _parse_cache_delta(start_counters):
+    """
+    :return: [hits, misses] of the process parse cache since start_counters
+    """
+    hits, misses, _ = shared_parse_cache.counters()
+    return [hits - start_counters[0], misses - start_counters[1]]
+
+
+def _report_parse_cache(hits_misses):
+    hits, misses = hits_misses
+    if hits + misses:
+        info_log(f'parse cache: {hits} hits, {misses} misses, hit rate {hits / (hits + misses):.0%}, '
+                 f'max size {shared_parse_cache.max_size}')
+
+
+def _pack_task_result(task_result):
+    """
+    :param task_result: [bool, table_or_err] of a sheet task, or sheet results of a whole xls task
+    """
+    if task_result and isinstance(task_result[0], bool):
+        rs, table_or_err = task_result[:2]
+        # body rows of a chunk are sent back as they are
+        return [rs, pack_table(table_or_err) if rs else table_or_err] + task_result[2:]
+
+    return [[sheet_name, fingerprint, _pack_task_result(sheet_result)]
+            for sheet_name, fingerprint, sheet_result in task_result]
+
+
+def _unpack_task_result(task_result):
+    if task_result and isinstance(task_result[0], bool):
+        rs, table_or_err = task_result[:2]
+        return [rs, unpack_table(table_or_err) if rs else table_or_err] + task_result[2:]
+
+    return [[sheet_name, fingerprint, _unpack_task_result(sheet_result)]
+            for sheet_name, fingerprint, sheet_result in task_result]
+
+
+class ProbeSchemaStage(Stage):
+    def __init__(self, xml_backend=None):
+        """
+        Read sheet headers only, for proto and code generation, body rows are never parsed
+        :param xml_backend: xlsx sheet xml parser, see XlsParser
+        """
+        super().__init__('ProbeSchema')
+        self.xml_backend = xml_backend
+
+    def execute(self, xls_list) -> list:
+        return list(self.stream(xls_list))
+
+    def stream(self, xls_list):
+        """
+        :param xls_list: input xls files' path
+        :return: iterator of header only tables, sheets with invalid header are logged and skipped
+        """
+        start_time = time.time()
+        parser = xls.XlsParser(columnar=True, schema_only=True, xml_backend=self.xml_backend)
+        for xls_path in xls_list:
+            for rs, table_or_err in parser.parse_one_xls(xls_path):
+                if rs:
+                    yield table_or_err
+                else:
+                    debug_log(f'probe schema failed, {table_or_err}')
+
+        info_log(f'probe all xls schema elapse {time.time() - start_time} seconds')
 
 
 class CSVExportStage(Stage):
-    def __init__(self, out_dir: str):
+    def __init__(self, out_dir: str, manifest: BuildManifest = None):
         """
         Export csv to target dir
         :param out_dir: target dir
+        :param manifest: incremental build manifest, csv of unchanged xls are not exported again
         """
         super().__init__('CSVExport')
         self.out_dir = out_dir
+        self.manifest = manifest
 
     def execute(self, all_table_results):
-        tables = []
+        return list(self.stream(all_table_results))
+
+    def stream(self, all_table_results):
         for table_rs in all_table_results:
             rs, table_or_err = table_rs
             if rs:
-                tables.append(table_or_err)
-                TableDataUtil.export_csv(f'{self.out_dir}/{table_or_err.name}.csv', table_or_err)
+                self._export_table(table_or_err)
+                yield table_or_err
             else:
                 debug_log(table_or_err)
 
-        return tables
+    def _export_table(self, table):
+        csv_path = f'{self.out_dir}/{table.name}.csv'
+        if self.manifest is None:
+            TableDataUtil.export_csv(csv_path, table)
+        else:
+            if not self.manifest.is_exported(table.xls, csv_path):
+                TableDataUtil.export_csv(csv_path, table)
+            self.manifest.add_output(table.xls, csv_path)
+
+
+class SaveManifestStage(Stage):
+    def __init__(self, manifest: BuildManifest):
+        """
+        Save incremental build manifest after all outputs are exported
+        :param manifest: incremental build manifest
+        """
+        super().__init__('SaveManifest')
+        self.manifest = manifest
+
+    def execute(self, param):
+        self.manifest.save()
+        return param
+
+    def stream(self, items):
+        yield from items
+        self.manifest.save()
 
 
 class TagFilterStage(Stage):
@@ -151,17 +560,20 @@ class TagFilterStage(Stage):
         self.tag_filter = tag_filter
 
     def execute(self, all_tables):
-        filtered_tables = []
+        return list(self.stream(all_tables))
+
+    def stream(self, all_tables):
         for tab in all_tables:
             filtered_tab = self._filter_table(tab)
             if filtered_tab:
-                filtered_tables.append(filtered_tab)
-
-        return filtered_tables
+                yield filtered_tab
 
     def _filter_table(self, source_tab):
         filtered_fields = self._filter_header_fields(source_tab)
-        if len(filtered_fields):
+        if len(filtered_fields) and isinstance(source_tab, ColumnarTable):
+            # take filtered columns as a whole, no row by row copy
+            return source_tab.select(filtered_fields, source_tab.content_row_indices())
+        elif len(filtered_fields):
             filtered_table = Table(source_tab.name, source_tab.xls)
 
             filtered_header = self._filter_header(filtered_fields, source_tab.header.name)
@@ -221,39 +633,56 @@ class ParseProtoStage(Stage):
                      '\trepeated Row_{} rows = 1;\n' \
                      '}}\n'
 
-    def __init__(self, proto_dir):
+    def __init__(self, proto_dir, manifest: BuildManifest = None):
+        """
+        Write .proto of each table from its header
+        :param proto_dir: proto output dir
+        :param manifest: incremental build manifest, proto of unchanged xls are not written again
+        """
         super().__init__('Parse Proto')
         self.proto_dir = proto_dir
+        self.manifest = manifest
 
     def execute(self, filtered_tables):
+        return list(self.stream(filtered_tables))
+
+    def stream(self, filtered_tables):
         assembler = ProtoTypeAssembler()
         for tab in filtered_tables:
-            header = tab.header
-            proto_body = []
-            index = 1
-            import_message_set = set()
-            for field in header.get_fields():
-                import_message_type, proto_field_str = assembler.assemble(field.data_type)
+            proto_path = f'{self.proto_dir}/{tab_proto_prefix}{tab.header.name}.proto'
+            if self.manifest is None:
+                self._write_proto(assembler, tab, proto_path)
+            else:
+                if not self.manifest.is_exported(tab.xls, proto_path):
+                    self._write_proto(assembler, tab, proto_path)
+                self.manifest.add_output(tab.xls, proto_path)
+            yield tab
 
-                if import_message_type and import_message_type not in import_message_set:
-                    import_message_set.add(import_message_type)
+    def _write_proto(self, assembler, tab, proto_path):
+        header = tab.header
+        proto_body = []
+        index = 1
+        import_message_set = set()
+        for field in header.get_fields():
+            import_message_type, proto_field_str = assembler.assemble(field.data_type)
 
-                proto_body.append(f'\t{proto_field_str} {field.field_name} = {index};\n')
-                index += 1
+            if import_message_type and import_message_type not in import_message_set:
+                import_message_set.add(import_message_type)
 
-            import_message_text = '\n'
-            for import_message_type in import_message_set:
-                message = assembler.builtin_repeated_messages[import_message_type]
-                import_message_text += f'{message}\n'
+            proto_body.append(f'\t{proto_field_str} {field.field_name} = {index};\n')
+            index += 1
 
-            row_message = ''
-            for proto_field in proto_body:
-                row_message += f'{proto_field}'
+        import_message_text = '\n'
+        for import_message_type in import_message_set:
+            message = assembler.builtin_repeated_messages[import_message_type]
+            import_message_text += f'{message}\n'
 
-            with open(f'{self.proto_dir}/{tab_proto_prefix}{header.name}.proto', 'w') as proto_file:
-                proto_file.write(self._format_proto(header.name, import_message_text, row_message))
+        row_message = ''
+        for proto_field in proto_body:
+            row_message += f'{proto_field}'
 
-        return filtered_tables
+        with open(proto_path, 'w') as proto_file:
+            proto_file.write(self._format_proto(header.name, import_message_text, row_message))
 
     def _format_proto(self, tab_name, import_proto, fields):
         return self.proto_template.format(import_proto, tab_name, fields, tab_name, tab_name)
@@ -268,6 +697,9 @@ class ProtoPythonGenStage(Stage):
         self.pb_dir = pb_dir
 
     def execute(self, filtered_tables):
+        return list(self.stream(filtered_tables))
+
+    def stream(self, filtered_tables):
         for tab in filtered_tables:
             proto_file = f'{self.proto_dir}/{tab_proto_prefix}{tab.header.name}.proto'
             if os.path.exists(proto_file):
@@ -278,7 +710,7 @@ class ProtoPythonGenStage(Stage):
                 os.system(cmd)
             else:
                 debug_log(f'{proto_file} not exists')
-        return filtered_tables
+            yield tab
 
 
 class ParseBytesStage(Stage):
@@ -288,27 +720,35 @@ class ParseBytesStage(Stage):
         self.proto_python_dir = proto_python_dir
 
     def execute(self, filtered_tables):
+        for _ in self.stream(filtered_tables):
+            pass
+
+    def stream(self, filtered_tables):
         # insert import path
         sys.path.insert(0, self.proto_python_dir)
         for tab in filtered_tables:
-            header = tab.header
-            # import protobuf py
-            module_name = f'{tab_proto_prefix}{header.name}_pb2'
-            module = __import__(module_name, locals(), globals())
-
-            rs = {}
-            cmd = f'{header.name}_message = module.{tab_proto_prefix}{header.name}()\n' \
-                  f'rows = {header.name}_message.rows\n' \
-                  f'self._fill_table_data(rows, tab, header)\n' \
-                  f'rs[\'msg\'] = {header.name}_message\n'
-
-            try:
-                exec(cmd)
-                with open(f'{self.bytes_dir}/{header.name}.bytes', 'wb') as bytes_file:
-                    bytes_file.write(rs['msg'].SerializeToString())
+            self._write_bytes(tab)
+            yield tab
 
-            except Exception as err:
-                debug_log(f'Xls : {tab.xls}, sheet : {tab.name}, {str(err)}')
+    def _write_bytes(self, tab):
+        header = tab.header
+        # import protobuf py
+        module_name = f'{tab_proto_prefix}{header.name}_pb2'
+        module = __import__(module_name, locals(), globals())
+
+        rs = {}
+        cmd = f'{header.name}_message = module.{tab_proto_prefix}{header.name}()\n' \
+              f'rows = {header.name}_message.rows\n' \
+              f'self._fill_table_data(rows, tab, header)\n' \
+              f'rs[\'msg\'] = {header.name}_message\n'
+
+        try:
+            exec(cmd)
+            with open(f'{self.bytes_dir}/{header.name}.bytes', 'wb') as bytes_file:
+                bytes_file.write(rs['msg'].SerializeToString())
+
+        except Exception as err:
+            debug_log(f'Xls : {tab.xls}, sheet : {tab.name}, {str(err)}')
 
     @staticmethod
     def _import(module):
@@ -316,11 +756,9 @@ class ParseBytesStage(Stage):
 
     @staticmethod
     def _fill_table_data(rows, table: Table, header: Header):
-        for tab_row in table.body:
+        for values in table.value_rows():
             # for exec cmd
             data_row = rows.add()
-            # content = tab_row.content
-            values = tab_row.values
             index = 0
             for field in header.get_fields():
                 if isinstance(field.data_type.organization, TabPrimitive):
@@ -347,11 +785,16 @@ class GenProtoStage(Stage):
         self.pb_dir = pb_dir
 
     def execute(self, proto_gen_tables):
+        for _ in self.stream(proto_gen_tables):
+            pass
+
+    def stream(self, proto_gen_tables):
         for table in proto_gen_tables:
             print(f'---{table.name}---')
             header = table.header
             for field in header.get_fields():
                 print(f'{field.data_type.to_client_csv_str()}')
+            yield table
 
 
 def _format_print_table(table):
@@ -366,14 +809,16 @@ class PrintParsedResultTableStage(Stage):
         super().__init__('PrintParsedResultTable')
 
     def execute(self, parsed_tables):
+        return list(self.stream(parsed_tables))
+
+    def stream(self, parsed_tables):
         for parsed_tab in parsed_tables:
             rs, tab_or_err = parsed_tab
             if rs:
                 _format_print_table(tab_or_err)
             else:
                 info_log(tab_or_err)
-
-        return parsed_tables
+            yield parsed_tab
 
 
 class PrintTableStage(Stage):
@@ -381,5 +826,10 @@ class PrintTableStage(Stage):
         super().__init__('PrintTable')
 
     def execute(self, all_tables):
+        for _ in self.stream(all_tables):
+            pass
+
+    def stream(self, all_tables):
         for t in all_tables:
             _format_print_table(t)
+            yield t
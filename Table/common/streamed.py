@@ -0,0 +1,99 @@
+from .xlrd.biffh import XL_CELL_EMPTY
+from .xlrd.sheet import Cell
+
+
+class StreamedSheet:
+    """
+    sheet view over rows streamed by xlrd Book.iter_sheet_rows, no cell grid is built
+    only header rows and the current row are held, cell access is the same as xlrd Sheet for cell_util
+    """
+
+    def __init__(self, name, rows, chunk=False):
+        """
+        :param name: sheet name
+        :param rows: rows iterator of xlrd Book.iter_sheet_rows, (rowx, cell types, cell values) in row order
+        :param chunk: rows are header rows and a chunk of the body, see xlrd.split_sheet_xml,
+          body rows start at the first one with cells instead of start_row
+        """
+        self.name = name
+        self.ncols = 0
+        self._rows = rows
+        self._row_cells = {}
+        self._pending_row = None
+        self._chunk = chunk
+        self._first_body_row = None
+        self._end_body_row = None
+
+    def load_header(self, header_row_count):
+        """
+        hold rows before header_row_count, ncols is the width of them
+        """
+        for rowx, types, values in self._rows:
+            if rowx >= header_row_count:
+                self._pending_row = [rowx, types, values]
+                self._first_body_row = rowx
+                self._end_body_row = rowx + 1
+                # no header cell, wide enough to report the empty primary field, not the empty sheet
+                if 0 == self.ncols:
+                    self.ncols = len(types)
+                return
+
+            self._row_cells[rowx] = [types, values]
+            self.ncols = max(self.ncols, len(types))
+
+    def load_rows(self, start_row, columns):
+        """
+        load body rows one by one, rows without cells in between are loaded empty
+        :param columns: columns read from body rows, cells of other columns are skipped by the reader
+        :return: iterator of row index, the row is the current row until the next one is loaded
+        """
+        if self._pending_row is None:
+            return
+
+        self._rows.project_columns(columns)
+
+        rowx, types, values = self._pending_row
+        self._pending_row = None
+        next_row = rowx if self._chunk else start_row
+        self._first_body_row = next_row
+        while True:
+            for empty_row in range(next_row, rowx):
+                self._row_cells = {}
+                yield empty_row
+
+            self._row_cells = {rowx: [types, values]}
+            self._end_body_row = rowx + 1
+            yield rowx
+            next_row = rowx + 1
+
+            row = next(self._rows, None)
+            if row is None:
+                return
+            rowx, types, values = row
+
+    @property
+    def body_rows(self):
+        """
+        :return: [first, end) of body rows read so far, None if the sheet has none
+        """
+        if self._end_body_row is None:
+            return None
+        return [self._first_body_row, self._end_body_row]
+
+    def cell_type(self, rowx, colx):
+        cells = self._row_cells.get(rowx)
+        if cells is None or colx >= len(cells[0]):
+            return XL_CELL_EMPTY
+        return cells[0][colx]
+
+    def cell_value(self, rowx, colx):
+        cells = self._row_cells.get(rowx)
+        if cells is None or colx >= len(cells[0]):
+            return ''
+        return cells[1][colx]
+
+    def cell(self, rowx, colx):
+        cells = self._row_cells.get(rowx)
+        if cells is None or colx >= len(cells[0]):
+            return Cell(XL_CELL_EMPTY, '')
+        return Cell(cells[0][colx], cells[1][colx])
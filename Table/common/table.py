@@ -37,6 +37,24 @@ class Table:
     def set_body(self, body: list):
         self.body = body
 
+    def extend(self, table):
+        """
+        append rows of table, which has the same header
+        """
+        self.body.extend(table.body)
+
+    def content_rows(self) -> list:
+        """
+        :return: csv texts of each row
+        """
+        return [row.content for row in self.body]
+
+    def value_rows(self) -> list:
+        """
+        :return: parsed values of each row
+        """
+        return [row.values for row in self.body]
+
 
 class TableDataUtil:
     @staticmethod
@@ -70,8 +88,4 @@ class TableDataUtil:
 
     @staticmethod
     def _body_csv(table: Table) -> list:
-        csv_body = []
-        for row in table.body:
-            csv_body.append(row.content)
-
-        return csv_body
+        return table.content_rows()
@@ -0,0 +1,127 @@
+import os
+import time
+import traceback
+
+from . import xls
+from .log import debug_log
+from .log import info_log
+
+
+class XlsWatcher:
+    """
+    Poll mtime and size of xls files in a dir, no platform file watcher needed
+    """
+
+    def __init__(self, xls_dir: str, xls_patterns: list):
+        self.xls_dir = xls_dir
+        self.xls_patterns = xls_patterns
+        # xls path => [mtime_ns, size] of last poll
+        self._stats = {}
+
+    def poll(self) -> list:
+        """
+        :return: [changed xls paths, removed xls paths] since last poll, every xls is changed on first poll
+        """
+        stats = {}
+        for xls_path in xls.collect_xls_files(self.xls_dir, self.xls_patterns):
+            try:
+                stat = os.stat(xls_path)
+            except OSError:
+                # removed between glob and stat, or replaced right now by the saving app
+                continue
+            stats[xls_path] = [stat.st_mtime_ns, stat.st_size]
+
+        changed = [xls_path for xls_path, stat in stats.items() if self._stats.get(xls_path) != stat]
+        removed = [xls_path for xls_path in self._stats if xls_path not in stats]
+        self._stats = stats
+        return [changed, removed]
+
+    def mtime(self, xls_path: str) -> float:
+        """
+        :return: mtime in seconds seen by last poll
+        """
+        return self._stats[xls_path][0] / 1e9
+
+
+class WatchBuild:
+    """
+    Long-running build, executes a warm pipeline again whenever an xls is saved
+    the pipeline keeps parse processes and parsed tables between executes, see pipeline.new_watch_pipeline
+    """
+
+    def __init__(self, build_pipeline, xls_dir: str, interval: float = 0.2):
+        """
+        :param build_pipeline: pipeline executed with xls_dir on every change
+        :param xls_dir: xls input dir
+        :param interval: seconds between two polls
+        """
+        self.pipeline = build_pipeline
+        self.xls_dir = xls_dir
+        self.interval = interval
+        self.watcher = XlsWatcher(xls_dir, xls.XlsFilePatterns)
+        self.rebuild_count = 0
+        # [changed, removed] xls of failed rebuilds, rebuilt again on next poll
+        self._pending = [[], []]
+        # traceback of last failed rebuild, the same failure is not logged again on every retry
+        self._last_failure = None
+
+    def run(self):
+        """
+        build everything once, then rebuild on every change until interrupted
+        """
+        info_log(f'watching {self.xls_dir}, poll every {self.interval} seconds, ctrl-c to stop')
+        last_poll_time = time.time()
+        try:
+            while True:
+                poll_time = time.time()
+                changed, removed = self._with_pending(*self.watcher.poll())
+                if changed or removed:
+                    self._pending = [[], []] if self.rebuild(changed, removed, last_poll_time) else [changed, removed]
+                last_poll_time = poll_time
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            info_log(f'stop watching {self.xls_dir} after {self.rebuild_count} rebuilds')
+        finally:
+            self.pipeline.close()
+
+    def rebuild(self, changed: list, removed: list, last_poll_time: float) -> bool:
+        """
+        :param changed: xls saved since last poll, or not rebuilt yet by a failed rebuild
+        :param removed: xls deleted since last poll, or not rebuilt yet by a failed rebuild
+        :param last_poll_time: time of the poll which did not see these changes yet
+        :return: False if rebuild failed, run retries it on next poll
+        """
+        start_time = time.time()
+        try:
+            self.pipeline.execute(self.xls_dir)
+        except Exception:
+            failure = traceback.format_exc()
+            if failure != self._last_failure:
+                debug_log(f'rebuild of {changed + removed} failed, retry on next poll\n{failure}')
+            self._last_failure = failure
+            return False
+
+        self._last_failure = None
+        end_time = time.time()
+        if 0 == self.rebuild_count:
+            info_log(f'initial build of {len(changed)} xls elapse {end_time - start_time:.3f} seconds')
+        else:
+            # a change is not visible before the last poll, even if the file keeps an older mtime, e.g. copied
+            change_time = min([max(self.watcher.mtime(xls_path), last_poll_time) for xls_path in changed]
+                              or [last_poll_time])
+            changed_names = [os.path.basename(xls_path) for xls_path in changed + removed]
+            info_log(f'rebuild {len(changed)} changed, {len(removed)} removed xls {changed_names}, '
+                     f'elapse {end_time - start_time:.3f} seconds, '
+                     f'change to output latency {end_time - change_time:.3f} seconds')
+        self.rebuild_count += 1
+        return True
+
+    def _with_pending(self, changed: list, removed: list) -> list:
+        """
+        :return: [changed, removed] of a poll with those of failed rebuilds, a path is only in the later one
+        """
+        pending_changed, pending_removed = self._pending
+        return [[xls_path for xls_path in pending_changed if xls_path not in removed and xls_path not in changed]
+                + changed,
+                [xls_path for xls_path in pending_removed if xls_path not in changed and xls_path not in removed]
+                + removed]
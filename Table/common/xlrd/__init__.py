@@ -38,7 +38,14 @@ def open_workbook(filename=None,
                   encoding_override=None,
                   formatting_info=False,
                   on_demand=False,
-                  ragged_rows=False):
+                  ragged_rows=False,
+                  sheet_selector=None,
+                  shared_strings=None,
+                  values_only=False,
+                  lazy_shared_strings=False,
+                  shared_strings_cache_size=None,
+                  xml_backend=None,
+                  pipelined_inflate=False):
     """
     Open a spreadsheet file for data extraction.
 
@@ -100,27 +107,65 @@ def open_workbook(filename=None,
       This can result in substantial memory savings if rows are of widely
       varying sizes. See also the :meth:`~xlrd.sheet.Sheet.row_len` method.
 
+    :param sheet_selector:
+
+      The sheets to load: a collection of sheet names, or a callable taking
+      a sheet name. Sheets left out are not decompressed nor parsed, they
+      are left unloaded (see :meth:`~xlrd.book.Book.sheet_loaded`).
+      For xls files only BIFF 8 workbooks load sheets selectively.
+      The default of ``None`` loads every sheet.
+
+    :param shared_strings:
+
+      Only for xlsx files. The shared strings table returned by
+      :func:`load_shared_strings` for this file; when given, the table is
+      not parsed again. Lets several loads of one workbook (e.g. one per
+      sheet in different processes) parse the table once.
+
+    :param values_only:
+
+      Only for xlsx files. Load cell values and types only: just the number
+      formats and cell XFs of the styles are read, enough to tell dates from
+      numbers; core properties, sheet relationships and comments are
+      skipped.
+
+    :param lazy_shared_strings:
+
+      Only for xlsx files. ``True`` records where each shared string is in
+      the table and decodes it when a cell first uses it, instead of
+      decoding the whole table on open. Worth it when only a few sheets,
+      or a few rows, are loaded.
+
+    :param shared_strings_cache_size:
+
+      With ``lazy_shared_strings``, the most decoded strings kept; ``None``
+      keeps every decoded string.
+
+    :param xml_backend:
+
+      Only for xlsx files. How worksheet XML is parsed: ``'etree'`` builds
+      an Element per row with the ElementTree implementation in use,
+      ``'lxml'`` does the same with lxml, ``'expat'`` converts cells from
+      ``xml.parsers.expat`` callbacks without building Elements. ``None``
+      is ``'etree'``.
+
+    :param pipelined_inflate:
+
+      Only for xlsx files. ``True`` inflates worksheet XML in a background
+      thread, a bounded number of chunks ahead of the parser, and starts
+      inflating the next sheet (in workbook order, of those selected by
+      ``sheet_selector``) as soon as one is opened. zlib releases the GIL,
+      so inflating and parsing run on two cores.
+
     :returns: An instance of the :class:`~xlrd.book.Book` class.
     """
 
-    peeksz = 4
-    if file_contents:
-        peek = file_contents[:peeksz]
-    else:
+    if not file_contents:
         filename = os.path.expanduser(filename)
-        with open(filename, "rb") as f:
-            peek = f.read(peeksz)
-    if peek == b"PK\x03\x04": # a ZIP file
-        if file_contents:
-            zf = zipfile.ZipFile(timemachine.BYTES_IO(file_contents))
-        else:
-            zf = zipfile.ZipFile(filename)
-
-        # Workaround for some third party files that use forward slashes and
-        # lower case names. We map the expected name in lowercase to the
-        # actual filename in the zip container.
-        component_names = dict([(X12Book.convert_filename(name), name)
-                                for name in zf.namelist()])
+    sheet_selector = _sheet_selector_predicate(sheet_selector)
+    zf = _open_zip(filename, file_contents)
+    if zf is not None:
+        component_names = _zip_component_names(zf)
 
         if verbosity:
             logfile.write('ZIP component_names:\n')
@@ -136,6 +181,13 @@ def open_workbook(filename=None,
                 formatting_info=formatting_info,
                 on_demand=on_demand,
                 ragged_rows=ragged_rows,
+                sheet_selector=sheet_selector,
+                shared_strings=shared_strings,
+                values_only=values_only,
+                lazy_shared_strings=lazy_shared_strings,
+                shared_strings_cache_size=shared_strings_cache_size,
+                xml_backend=xml_backend,
+                pipelined_inflate=pipelined_inflate,
             )
             return bk
         if 'xl/workbook.bin' in component_names:
@@ -155,10 +207,127 @@ def open_workbook(filename=None,
         formatting_info=formatting_info,
         on_demand=on_demand,
         ragged_rows=ragged_rows,
+        sheet_selector=sheet_selector,
     )
     return bk
 
 
+def _sheet_selector_predicate(sheet_selector):
+    """
+    Turn a ``sheet_selector`` given as a collection of sheet names into the
+    equivalent callable; a callable or ``None`` is returned as it is.
+    """
+    if sheet_selector is None or callable(sheet_selector):
+        return sheet_selector
+    if isinstance(sheet_selector, str):
+        sheet_selector = [sheet_selector]
+    sheet_names = frozenset(sheet_selector)
+    return lambda sheet_name: sheet_name in sheet_names
+
+
+def sheet_fingerprints(filename=None, file_contents=None, logfile=sys.stdout, verbosity=0):
+    """
+    Cheap change detection for xlsx files: fingerprints of each worksheet
+    read from the zip central directory, nothing but the workbook part is
+    decompressed.
+
+    :returns: A dict mapping sheet name to a
+      ``(sheet CRC32, sheet size, shared strings CRC32, shared strings size)``
+      tuple, or ``None`` if the file is not an xlsx workbook.
+    """
+    if not file_contents:
+        filename = os.path.expanduser(filename)
+    zf = _open_zip(filename, file_contents)
+    if zf is None:
+        return None
+    with zf:
+        component_names = _zip_component_names(zf)
+        if 'xl/workbook.xml' not in component_names:
+            return None
+        from . import xlsx
+        return xlsx.sheet_fingerprints_2007_xml(zf, component_names, logfile=logfile, verbosity=verbosity)
+
+
+def load_shared_strings(filename=None, file_contents=None, logfile=sys.stdout, verbosity=0,
+                        lazy=False, cache_size=None):
+    """
+    Parse only the shared strings table of an xlsx file, see the
+    ``shared_strings`` argument of :func:`open_workbook`.
+
+    :param lazy: decode strings on first access, see the
+      ``lazy_shared_strings`` argument of :func:`open_workbook`.
+
+    :param cache_size: the most decoded strings kept when ``lazy``.
+
+    :returns: A list of strings, a sequence decoding them on access when
+      ``lazy``, or ``None`` if the file is not an xlsx workbook.
+    """
+    if not file_contents:
+        filename = os.path.expanduser(filename)
+    zf = _open_zip(filename, file_contents)
+    if zf is None:
+        return None
+    with zf:
+        component_names = _zip_component_names(zf)
+        if 'xl/workbook.xml' not in component_names:
+            return None
+        from . import xlsx
+        return xlsx.load_shared_strings_2007_xml(zf, component_names, logfile=logfile, verbosity=verbosity,
+                                                 lazy=lazy, cache_size=cache_size)
+
+
+def split_sheet_xml(filename=None, file_contents=None, sheet_name=None, chunk_size=16 * 1024 * 1024,
+                    lead_rows=0, logfile=sys.stdout, verbosity=0):
+    """
+    Split the XML of one xlsx worksheet at row boundaries, so that parts of
+    a huge sheet can be parsed in parallel; read each chunk with the ``xml``
+    argument of :meth:`~xlrd.book.Book.iter_sheet_rows`.
+
+    :param chunk_size: about how many bytes of XML in each chunk.
+
+    :param lead_rows: rows before this one, e.g. a header, are copied to the
+      front of every chunk.
+
+    :returns: A list of ``(first rowx, chunk XML)`` tuples in row order, see
+      :func:`~xlrd.xlsx.split_worksheet_xml`, or ``None`` if the file is not
+      an xlsx workbook.
+    """
+    if not file_contents:
+        filename = os.path.expanduser(filename)
+    zf = _open_zip(filename, file_contents)
+    if zf is None:
+        return None
+    with zf:
+        component_names = _zip_component_names(zf)
+        if 'xl/workbook.xml' not in component_names:
+            return None
+        from . import xlsx
+        return xlsx.split_sheet_xml_2007(zf, component_names, sheet_name, chunk_size, lead_rows,
+                                         logfile=logfile, verbosity=verbosity)
+
+
+def _open_zip(filename, file_contents):
+    peeksz = 4
+    if file_contents:
+        peek = file_contents[:peeksz]
+    else:
+        with open(filename, "rb") as f:
+            peek = f.read(peeksz)
+    if peek != b"PK\x03\x04": # not a ZIP file
+        return None
+    if file_contents:
+        return zipfile.ZipFile(timemachine.BYTES_IO(file_contents))
+    return zipfile.ZipFile(filename)
+
+
+def _zip_component_names(zf):
+    # Workaround for some third party files that use forward slashes and
+    # lower case names. We map the expected name in lowercase to the
+    # actual filename in the zip container.
+    return dict([(X12Book.convert_filename(name), name)
+                 for name in zf.namelist()])
+
+
 def dump(filename, outfile=sys.stdout, unnumbered=False):
     """
     For debugging: dump an XLS file's BIFF records in char & hex.
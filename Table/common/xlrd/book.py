@@ -70,7 +70,8 @@ def open_workbook_xls(filename=None,
                       logfile=sys.stdout, verbosity=0, use_mmap=USE_MMAP,
                       file_contents=None,
                       encoding_override=None,
-                      formatting_info=False, on_demand=False, ragged_rows=False):
+                      formatting_info=False, on_demand=False, ragged_rows=False,
+                      sheet_selector=None):
     t0 = perf_counter()
     if TOGGLE_GC:
         orig_gc_enabled = gc.isenabled()
@@ -116,7 +117,13 @@ def open_workbook_xls(filename=None,
             bk.parse_globals()
             bk._sheet_list = [None for sh in bk._sheet_names]
             if not on_demand:
-                bk.get_sheets()
+                if sheet_selector is None:
+                    bk.get_sheets()
+                else:
+                    # sheets not selected are never parsed, nor loadable later
+                    for sheetno, sheet_name in enumerate(bk._sheet_names):
+                        if sheet_selector(sheet_name):
+                            bk.get_sheet(sheetno)
         bk.nsheets = len(bk._sheet_list)
         if biff_version == 45 and bk.nsheets > 1:
             fprintf(
@@ -139,6 +146,33 @@ def open_workbook_xls(filename=None,
     return bk
 
 
+class LoadedSheetRows(object):
+    """
+    Rows of a loaded sheet, see :meth:`Book.iter_sheet_rows`.
+    """
+
+    def __init__(self, sh, nrows=None):
+        self._sheet = sh
+        self._rowx = 0
+        self._nrows = sh.nrows if nrows is None else min(nrows, sh.nrows)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        rowx = self._rowx
+        if rowx >= self._nrows:
+            raise StopIteration
+        self._rowx = rowx + 1
+        return rowx, self._sheet.row_types(rowx), self._sheet.row_values(rowx)
+
+    next = __next__
+
+    def project_columns(self, colxs):
+        # cells are all loaded already, their values are kept
+        pass
+
+
 class Name(BaseObject):
     """
     Information relating to a named reference, formula, macro, etc.
@@ -500,6 +534,42 @@ class Book(BaseObject):
                 raise XLRDError('No sheet named <%r>' % sheet_name_or_index)
         return bool(self._sheet_list[sheetx])
 
+    def iter_sheet_rows(self, sheet_name_or_index, nrows=None, xml=None):
+        """
+        :param sheet_name_or_index: Name or index of sheet to be read.
+        :param nrows: If given, only rows before ``nrows`` are read; an xlsx
+          sheet's XML is not parsed any further than that.
+        :param xml: If given, the rows of this worksheet XML are read instead
+          of the sheet's own, e.g. a chunk from :func:`~xlrd.split_sheet_xml`.
+          Only for xlsx files opened ``on_demand``.
+        :returns: An iterator of ``(rowx, cell types, cell values)`` tuples,
+          in row order. Rows without cells may be left out. Its
+          ``project_columns(colxs)`` method tells which columns are still
+          needed; cells of other columns may be left empty from then on.
+          Projection only ever drops cell values: the rows yielded and their
+          widths are the same as without it, so a row whose cells are all
+          in other columns is still yielded.
+
+        For an xlsx sheet not yet loaded in ``on_demand`` mode, rows are
+        yielded while the worksheet XML is parsed and the cell grid of the
+        sheet is never built. Otherwise the sheet is loaded and its rows
+        yielded.
+        """
+        if isinstance(sheet_name_or_index, int):
+            sheetx = sheet_name_or_index
+        else:
+            try:
+                sheetx = self._sheet_names.index(sheet_name_or_index)
+            except ValueError:
+                raise XLRDError('No sheet named <%r>' % sheet_name_or_index)
+        if xml is not None and self._sheet_loader is None:
+            raise XLRDError("Worksheet XML can only be read for xlsx files opened on_demand.")
+        if self._sheet_loader is not None and (xml is not None or not self._sheet_list[sheetx]):
+            if self._resources_released:
+                raise XLRDError("Can't load sheets after releasing resources.")
+            return self._sheet_loader.iter_rows(sheetx, nrows, xml)
+        return LoadedSheetRows(self.sheet_by_index(sheetx), nrows)
+
     def unload_sheet(self, sheet_name_or_index):
         """
         :param sheet_name_or_index: Name or index of sheet to be unloaded.
@@ -537,6 +607,9 @@ class Book(BaseObject):
         self.filestr = None
         self._sharedstrings = None
         self._rich_text_runlist_map = None
+        if self._sheet_loader is not None:
+            self._sheet_loader.close()
+            self._sheet_loader = None
 
     def __enter__(self):
         return self
@@ -590,6 +663,8 @@ class Book(BaseObject):
         self.style_name_map = {}
         self.mem = b''
         self.filestr = b''
+        # xlsx on_demand mode: parses a worksheet part when the sheet is first demanded
+        self._sheet_loader = None
 
     def biff2_8_load(self, filename=None, file_contents=None,
                      logfile=sys.stdout, verbosity=0, use_mmap=USE_MMAP,
@@ -696,6 +771,8 @@ class Book(BaseObject):
     def get_sheet(self, sh_number, update_pos=True):
         if self._resources_released:
             raise XLRDError("Can't load sheets after releasing resources.")
+        if self._sheet_loader is not None:
+            return self._sheet_loader.load_sheet(sh_number)
         if update_pos:
             self._position = self._sh_abs_posn[sh_number]
         self.getbof(XL_WORKSHEET)
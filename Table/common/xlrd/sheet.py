@@ -633,6 +633,46 @@ class Sheet(BaseObject):
                     trow[rlen:] = self.bt * nextra
                     if s_fmt_info:
                         s_cell_xf_indexes[rowx][rlen:] = self.bf * nextra
+                elif nextra < 0:
+                    # put_row row preallocated wider than the cells found
+                    del s_cell_values[rowx][ncols:]
+                    del trow[ncols:]
+
+    def put_row(self, rowx, types, values, ncols):
+        """
+        Store a whole row at once, instead of one ``put_cell`` call per cell.
+
+        ``types`` and ``values`` start at column 0, with ``XL_CELL_EMPTY``
+        where there is no cell; number cell types must already be looked up.
+        ``ncols`` is 1 + the column of the last cell; the lists may be longer
+        when they were preallocated to the width given by the DIMENSIONS.
+        No XF indexes are stored.
+        """
+        if rowx < self.nrows or self.formatting_info:
+            # row seen before (rows not in ascending order), or XF indexes are kept
+            for colx in xrange(ncols):
+                if types[colx] != XL_CELL_EMPTY:
+                    self.put_cell(rowx, colx, types[colx], values[colx], -1)
+            return
+        assert 0 < ncols <= self.utter_max_cols
+        assert 0 <= rowx < self.utter_max_rows
+        if self.ragged_rows and len(types) > ncols:
+            types = types[:ncols]
+            values = values[:ncols]
+        scta = self._cell_types.append
+        scva = self._cell_values.append
+        bt = self.bt
+        for _unused in xrange(self.nrows, rowx):
+            # no cells in these rows
+            scta(bt * 0)
+            scva([])
+        scta(array('B', types))
+        scva(values)
+        self.nrows = rowx + 1
+        if ncols > self.ncols:
+            self.ncols = ncols
+        # rows are not widened as they are put, tidy_dimensions fixes all of them
+        self._first_full_rowx = -2
 
     def put_cell_ragged(self, rowx, colx, ctype, value, xf_index):
         if ctype is None:
@@ -7,11 +7,15 @@ from __future__ import print_function, unicode_literals
 
 import re
 import sys
+import threading
+from array import array
+from functools import lru_cache
 from os.path import join, normpath
+from queue import Empty, Queue
 
 from .biffh import (
-    XL_CELL_BLANK, XL_CELL_BOOLEAN, XL_CELL_ERROR, XL_CELL_TEXT, XLRDError,
-    error_text_from_code,
+    XL_CELL_BLANK, XL_CELL_BOOLEAN, XL_CELL_EMPTY, XL_CELL_ERROR, XL_CELL_TEXT,
+    XLRDError, error_text_from_code,
 )
 from .book import Book, Name
 from .formatting import XF, Format, is_date_format_string
@@ -435,7 +439,14 @@ class X12SST(X12General):
         si_tag = U_SSML12 + 'si'
         elemno = -1
         sst = self.bk._sharedstrings
-        for event, elem in ET.iterparse(stream):
+        # the first event starts the root <sst>, its <si> children are
+        # removed once read, so memory doesn't grow with the string count
+        root = None
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
             if elem.tag != si_tag: continue
             elemno = elemno + 1
             if self.verbosity >= 3:
@@ -443,7 +454,7 @@ class X12SST(X12General):
                 self.dump_elem(elem)
             result = get_text_from_si_or_is(self, elem)
             sst.append(result)
-            elem.clear() # destroy all child elements
+            del root[:] # detach it (and all its child elements) from the root
         if self.verbosity >= 2:
             self.dumpout('Entries in SST: %d', len(sst))
         if self.verbosity >= 3:
@@ -467,6 +478,76 @@ class X12SST(X12General):
         if self.verbosity >= 2:
             self.dumpout('Entries in SST: %d', len(sst))
 
+class X12LazySST(object):
+    """
+    Shared strings table decoded on demand: only the byte offset of each
+    ``<si>`` element is recorded when the workbook is opened, a string is
+    decoded the first time its index is looked up.
+
+    Looks like the list of strings built by :class:`X12SST`.
+    """
+
+    def __init__(self, data, cache_size=None):
+        """
+        :param data: the bytes of ``xl/sharedStrings.xml``.
+        :param cache_size: the most decoded strings kept, ``None`` keeps all
+          of them, ``0`` decodes on every access.
+        """
+        self.data = data
+        self.cache_size = cache_size
+        # <si> elements are decoded inside a copy of the root start tag,
+        # so its namespace declarations (and prefix, if any) still apply
+        root_match = re.search(br'<((?:[\w.-]+:)?)sst\b[^>]*>', data)
+        if root_match is None or root_match.group(0).endswith(b'/>'):
+            self._root = b''
+            self._offsets = array('L')
+            return
+        prefix = re.escape(root_match.group(1))
+        self._root = root_match.group(0)
+        self._root_end = b'</' + root_match.group(1) + b'sst>'
+        # most strings are a single <t> without entities, no need to parse them
+        self._plain_si = re.compile(br'<%ssi><%st( xml:space="preserve")?>([^<&\r]*)</%st></%ssi>\s*'
+                                    % (prefix, prefix, prefix, prefix))
+        offsets = array('L', (match.start() for match in re.finditer(br'<' + prefix + br'si[\s/>]', data)))
+        # end of the last <si>
+        offsets.append(data.rindex(b'</' + prefix + b'sst'))
+        self._offsets = offsets
+        self._text = lru_cache(maxsize=cache_size)(self._decode)
+
+    def __len__(self):
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('shared string index out of range')
+        return self._text(index)
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+    def __getstate__(self):
+        # decoded strings stay behind, e.g. when sent to another process
+        return self.data, self.cache_size
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def _decode(self, index):
+        offsets = self._offsets
+        start = offsets[index]
+        end = offsets[index + 1]
+        plain = self._plain_si.fullmatch(self.data, start, end)
+        if plain is not None:
+            text = plain.group(2).decode('utf-8')
+            if plain.group(1) is None:
+                text = text.strip(XML_WHITESPACE)
+            return unescape(text)
+        root = ET.fromstring(self._root + self.data[start:end] + self._root_end)
+        return get_text_from_si_or_is(self, root[0])
+
 class X12Styles(X12General):
 
     def __init__(self, bk, logfile=DLF, verbosity=0):
@@ -523,12 +604,54 @@ class X12Styles(X12General):
     }
     augment_keys(tag2meth, U_SSML12)
 
+    # values_only loading: xf type is set when its container starts, number formats and xfs once they end
+    values_start_tag2meth = {
+        'cellStyleXfs': do_cellstylexfs,
+        'cellXfs':      do_cellxfs,
+    }
+    augment_keys(values_start_tag2meth, U_SSML12)
+    values_end_tag2meth = {
+        'numFmt':       do_numfmt,
+        'xf':           do_xf,
+    }
+    augment_keys(values_end_tag2meth, U_SSML12)
+    values_last_tags = ('cellXfs', U_SSML12 + 'cellXfs')
+
+    def process_values_stream(self, stream, heading=None):
+        """
+        Read only what tells dates from numbers: the number formats and
+        the cell XFs. Stops once cellXfs ends; fonts, fills, borders,
+        dxfs etc. are never built into a tree.
+        """
+        if not ET_has_iterparse:
+            self.process_stream(stream, heading)
+            return
+        if self.verbosity >= 2 and heading is not None:
+            fprintf(self.logfile, "\n=== %s ===\n", heading)
+        start_getmethod = self.values_start_tag2meth.get
+        end_getmethod = self.values_end_tag2meth.get
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                meth = start_getmethod(elem.tag)
+                if meth:
+                    meth(self, elem)
+                continue
+            meth = end_getmethod(elem.tag)
+            if meth:
+                meth(self, elem)
+            elif elem.tag in self.values_last_tags:
+                break
+            elem.clear()
+        self.finish_off()
+
 class X12Sheet(X12General):
 
-    def __init__(self, sheet, logfile=DLF, verbosity=0):
+    def __init__(self, sheet, logfile=DLF, verbosity=0, xml_backend=None):
         self.sheet = sheet
         self.logfile = logfile
         self.verbosity = verbosity
+        # parses <sheetData>, see get_xml_backend
+        self.xml_backend = xml_backend or get_xml_backend()
         self.rowx = -1 # We may need to count them.
         self.bk = sheet.book
         self.sst = self.bk._sharedstrings
@@ -537,23 +660,26 @@ class X12Sheet(X12General):
         self.merged_cells = sheet.merged_cells
         self.warned_no_cell_name = 0
         self.warned_no_row_num = 0
+        # None, or the set of column indexes whose cells are kept
+        self.column_filter = None
+        # width rows are preallocated to, from <dimension>; 0 when rows are ragged
+        self.row_width = 0
         if ET_has_iterparse:
             self.process_stream = self.own_process_stream
 
     def own_process_stream(self, stream, heading=None):
+        for _ in self.iter_parsed_rows(stream, heading):
+            pass
+        self.finish_off()
+
+    def iter_parsed_rows(self, stream, heading=None):
+        """
+        Parse the worksheet stream, yielding the row index each time a
+        <row> has been put into ``self.sheet``.
+        """
         if self.verbosity >= 2 and heading is not None:
             fprintf(self.logfile, "\n=== %s ===\n", heading)
-        row_tag = U_SSML12 + "row"
-        self_do_row = self.do_row
-        for event, elem in ET.iterparse(stream):
-            if elem.tag == row_tag:
-                self_do_row(elem)
-                elem.clear() # destroy all child elements (cells)
-            elif elem.tag == U_SSML12 + "dimension":
-                self.do_dimension(elem)
-            elif elem.tag == U_SSML12 + "mergeCell":
-                self.do_merge_cell(elem)
-        self.finish_off()
+        return self.xml_backend.iter_rows(self, stream)
 
     def process_rels(self, stream):
         if self.verbosity >= 2:
@@ -603,6 +729,8 @@ class X12Sheet(X12General):
             self.sheet._dimnrows = rowx + 1
             if colx is not None:
                 self.sheet._dimncols = colx + 1
+                if not self.sheet.ragged_rows:
+                    self.row_width = colx + 1
 
     def do_merge_cell(self, elem):
         # The ref attribute should be a cell range like "B1:D5".
@@ -641,6 +769,14 @@ class X12Sheet(X12General):
             self.dumpout("<row> row_number=%r rowx=%d explicit=%d",
                 row_number, self.rowx, explicit_row_number)
         letter_value = _UPPERCASE_1_REL_INDEX
+        column_filter = self.column_filter
+        formatting_info = self.bk.formatting_info
+        xf_type_map = self.sheet._xf_index_to_xl_type_map
+        # rows are as wide as <dimension> says from the start, so cells are stored, not appended
+        row_len = self.row_width
+        row_types = [XL_CELL_EMPTY] * row_len
+        row_values = [''] * row_len
+        row_ncols = 0 # highest colx holding a cell, plus 1
         for cell_elem in row_elem:
             cell_name = cell_elem.get('r')
             if cell_name is None: # Yes, it's optional.
@@ -672,7 +808,18 @@ class X12Sheet(X12General):
             xf_index = int(cell_elem.get('s', '0'))
             cell_type = cell_elem.get('t', 'n')
             tvalue = None
-            if cell_type == 'n':
+            if column_filter is not None and colx not in column_filter and (cell_type == 'n' or cell_type == 's'):
+                # projected out: the value is never converted, but the cell
+                # is kept as an empty one wherever it would have been stored,
+                # so rows and their widths are the same as unprojected
+                if not formatting_info:
+                    for child in cell_elem:
+                        if child.tag == V_TAG:
+                            tvalue = child.text
+                    if not tvalue:
+                        continue
+                ctype, value = XL_CELL_EMPTY, ''
+            elif cell_type == 'n':
                 # n = number. Most frequent type.
                 # <v> child contains plain text which can go straight into float()
                 # OR there's no text in which case it's a BLANK cell
@@ -686,10 +833,12 @@ class X12Sheet(X12General):
                     else:
                         raise Exception('unexpected tag %r' % child_tag)
                 if not tvalue:
-                    if self.bk.formatting_info:
-                        self.sheet.put_cell(rowx, colx, XL_CELL_BLANK, '', xf_index)
+                    if not formatting_info:
+                        continue
+                    ctype, value = XL_CELL_BLANK, ''
                 else:
-                    self.sheet.put_cell(rowx, colx, None, float(tvalue), xf_index)
+                    # we have a number, so look up the cell type
+                    ctype, value = xf_type_map[xf_index], float(tvalue)
             elif cell_type == "s":
                 # s = index into shared string table. 2nd most frequent type
                 # <v> child contains plain text which can go straight into int()
@@ -704,11 +853,11 @@ class X12Sheet(X12General):
                         bad_child_tag(child_tag)
                 if not tvalue:
                     # <c r="A1" t="s"/>
-                    if self.bk.formatting_info:
-                        self.sheet.put_cell(rowx, colx, XL_CELL_BLANK, '', xf_index)
+                    if not formatting_info:
+                        continue
+                    ctype, value = XL_CELL_BLANK, ''
                 else:
-                    value = self.sst[int(tvalue)]
-                    self.sheet.put_cell(rowx, colx, XL_CELL_TEXT, value, xf_index)
+                    ctype, value = XL_CELL_TEXT, self.sst[int(tvalue)]
             elif cell_type == "str":
                 # str = string result from formula.
                 # Should have <f> (formula) child; however in one file, all text cells are str with no formula.
@@ -724,7 +873,7 @@ class X12Sheet(X12General):
                         bad_child_tag(child_tag)
                 # assert tvalue is not None and formula is not None
                 # Yuk. Fails with file created by gnumeric -- no tvalue!
-                self.sheet.put_cell(rowx, colx, XL_CELL_TEXT, tvalue, xf_index)
+                ctype, value = XL_CELL_TEXT, tvalue
             elif cell_type == "b":
                 # b = boolean
                 # <v> child contains "0" or "1"
@@ -737,7 +886,7 @@ class X12Sheet(X12General):
                         pass
                     else:
                         bad_child_tag(child_tag)
-                self.sheet.put_cell(rowx, colx, XL_CELL_BOOLEAN, cnv_xsd_boolean(tvalue), xf_index)
+                ctype, value = XL_CELL_BOOLEAN, cnv_xsd_boolean(tvalue)
             elif cell_type == "e":
                 # e = error
                 # <v> child contains e.g. "#REF!"
@@ -751,8 +900,7 @@ class X12Sheet(X12General):
                         pass
                     else:
                         bad_child_tag(child_tag)
-                value = error_code_from_text[tvalue]
-                self.sheet.put_cell(rowx, colx, XL_CELL_ERROR, value, xf_index)
+                ctype, value = XL_CELL_ERROR, error_code_from_text[tvalue]
             elif cell_type == "inlineStr":
                 # Not expected in files produced by Excel.
                 # It's a way of allowing 3rd party s/w to write text (including rich text) cells
@@ -769,18 +917,350 @@ class X12Sheet(X12General):
                     else:
                         bad_child_tag(child_tag)
                 if not tvalue:
-                    if self.bk.formatting_info:
-                        self.sheet.put_cell(rowx, colx, XL_CELL_BLANK, '', xf_index)
+                    if not formatting_info:
+                        continue
+                    ctype, value = XL_CELL_BLANK, ''
                 else:
-                    self.sheet.put_cell(rowx, colx, XL_CELL_TEXT, tvalue, xf_index)
+                    ctype, value = XL_CELL_TEXT, tvalue
             else:
                 raise Exception("Unknown cell type %r in rowx=%d colx=%d" % (cell_type, rowx, colx))
+            if colx < row_len:
+                # within the preallocated width, or cells not in column order
+                row_types[colx] = ctype
+                row_values[colx] = value
+            else:
+                if colx > row_len:
+                    row_types.extend([XL_CELL_EMPTY] * (colx - row_len))
+                    row_values.extend([''] * (colx - row_len))
+                row_types.append(ctype)
+                row_values.append(value)
+                row_len = colx + 1
+            if colx >= row_ncols:
+                row_ncols = colx + 1
+        if row_ncols:
+            # the whole row goes into the sheet at once
+            self.sheet.put_row(rowx, row_types, row_values, row_ncols)
+
 
     tag2meth = {
         'row':          do_row,
     }
     augment_keys(tag2meth, U_SSML12)
 
+class EtreeSheetBackend(object):
+    """
+    Worksheet parsing with ``iterparse`` of an ElementTree implementation:
+    each <row> is built as an Element and read by :meth:`X12Sheet.do_row`.
+    """
+
+    def __init__(self, name, etree=None):
+        self.name = name
+        # None: the implementation picked by ensure_elementtree_imported
+        self.etree = etree
+
+    def iter_rows(self, x12sheet, stream):
+        row_tag = U_SSML12 + "row"
+        sheet_data_tag = U_SSML12 + "sheetData"
+        self_do_row = x12sheet.do_row
+        # rows are removed from <sheetData> once read, so memory doesn't grow with the row count
+        sheet_data = None
+        for event, elem in (self.etree or ET).iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                if sheet_data is None and elem.tag == sheet_data_tag:
+                    sheet_data = elem
+                continue
+            if elem.tag == row_tag:
+                self_do_row(elem)
+                if sheet_data is not None:
+                    del sheet_data[:] # detach the row (and its cells)
+                else:
+                    elem.clear() # destroy all child elements (cells)
+                yield x12sheet.rowx
+            elif elem.tag == U_SSML12 + "dimension":
+                x12sheet.do_dimension(elem)
+            elif elem.tag == U_SSML12 + "mergeCell":
+                x12sheet.do_merge_cell(elem)
+
+
+class ExpatSheetBackend(object):
+    """
+    Worksheet parsing with ``xml.parsers.expat`` callbacks: cell values are
+    converted as the parser reports them, no Element is made. Rows are the
+    same as :meth:`X12Sheet.do_row` puts into the sheet.
+    """
+
+    name = 'expat'
+
+    # expat names are "uri}local" with namespace_separator='}'
+    ROW_TAG = U_SSML12[1:] + 'row'
+    C_TAG = U_SSML12[1:] + 'c'
+    V_TAG = V_TAG[1:]
+    F_TAG = F_TAG[1:]
+    IS_TAG = IS_TAG[1:]
+    R_TAG = U_SSML12[1:] + 'r'
+    T_TAG = U_SSML12[1:] + 't'
+    DIMENSION_TAG = U_SSML12[1:] + 'dimension'
+    MERGE_CELL_TAG = U_SSML12[1:] + 'mergeCell'
+    XML_SPACE_ATTR = XML_SPACE_ATTR[1:]
+
+    def __init__(self, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+
+    def iter_rows(self, x12sheet, stream):
+        from xml.parsers import expat
+        parser = expat.ParserCreate(namespace_separator='}')
+        parser.buffer_text = True
+        parsed_rows = []
+        parser.StartElementHandler, parser.EndElementHandler, parser.CharacterDataHandler = \
+            self.make_handlers(x12sheet, parsed_rows)
+        put_row = x12sheet.sheet.put_row
+        chunk_size = self.chunk_size
+        while 1:
+            chunk = stream.read(chunk_size)
+            parser.Parse(chunk, not chunk)
+            # rows of a chunk are put one at a time, a row sink holds one row only
+            for rowx, row_types, row_values, row_ncols in parsed_rows:
+                x12sheet.rowx = rowx
+                if row_ncols:
+                    put_row(rowx, row_types, row_values, row_ncols)
+                yield rowx
+            del parsed_rows[:]
+            if not chunk:
+                break
+
+    def make_handlers(self, x12sheet, parsed_rows):
+        """
+        :returns: expat start element, end element and char data handlers,
+          appending ``(rowx, cell types, cell values, ncols)`` of each
+          <row> to ``parsed_rows``.
+        """
+        # state is kept in closure variables, the handlers run for every element
+        row_tag, c_tag, v_tag, f_tag, is_tag, r_tag, t_tag = (
+            self.ROW_TAG, self.C_TAG, self.V_TAG, self.F_TAG, self.IS_TAG, self.R_TAG, self.T_TAG)
+        dimension_tag, merge_cell_tag, xml_space_attr = self.DIMENSION_TAG, self.MERGE_CELL_TAG, self.XML_SPACE_ATTR
+        sst = x12sheet.sst
+        formatting_info = x12sheet.bk.formatting_info
+        xf_type_map = x12sheet.sheet._xf_index_to_xl_type_map
+        colx_by_letters = {}
+        # char data since the last <v> or <t> started
+        text = []
+        rowx = -1
+        row_number = None
+        row_types = row_values = None
+        row_len = row_ncols = 0
+        colx = -1
+        # element depth below <c>, -1 outside of a cell
+        cell_depth = -1
+        # cell of a column projected out, its value is not converted
+        projected = False
+        cell_type = None
+        xf_index = 0
+        tvalue = None
+        reading_text = False
+        text_attrs = None
+        is_parts = None
+        is_child = None
+
+        def cooked_text():
+            # same as cooked_text(), from char data
+            t = ''.join(text)
+            if text_attrs.get(xml_space_attr) != 'preserve':
+                t = t.strip(XML_WHITESPACE)
+            return ensure_unicode(unescape(t))
+
+        def start_element(name, attrs):
+            nonlocal rowx, row_number, row_types, row_values, row_len, row_ncols, colx, cell_depth, projected, \
+                cell_type, xf_index, tvalue, reading_text, text_attrs, is_parts, is_child
+            if cell_depth >= 0:
+                cell_depth += 1
+                if cell_depth == 1:
+                    if name == v_tag:
+                        del text[:]
+                        reading_text = True
+                        text_attrs = attrs
+                    elif name == is_tag and cell_type == 'inlineStr':
+                        is_parts = []
+                    elif name != f_tag:
+                        raise Exception('cell type %s has unexpected child <%s> at rowx=%r colx=%r'
+                                        % (cell_type, name, rowx, colx))
+                elif is_parts is not None:
+                    # <is> holds <t> and <r><t>, other text (e.g. phonetic runs) is left out
+                    if cell_depth == 2:
+                        is_child = name
+                        if name == t_tag:
+                            del text[:]
+                            reading_text = True
+                            text_attrs = attrs
+                    elif cell_depth == 3 and name == t_tag and is_child == r_tag:
+                        del text[:]
+                        reading_text = True
+                        text_attrs = attrs
+            elif name == c_tag:
+                cell_depth = 0
+                cell_name = attrs.get('r')
+                if cell_name is None: # Yes, it's optional.
+                    colx += 1
+                    if x12sheet.verbosity and not x12sheet.warned_no_cell_name:
+                        x12sheet.dumpout("no cellname; assuming rowx=%d colx=%d", rowx, colx)
+                        x12sheet.warned_no_cell_name = 1
+                else:
+                    letters = cell_name.rstrip('0123456789')
+                    colx = colx_by_letters.get(letters)
+                    if colx is None:
+                        colx = colx_by_letters[letters] = cell_name_to_colx(cell_name, row_number)
+                    elif row_number is not None and cell_name[len(letters):] != row_number:
+                        raise Exception('cell name %r but row number is %r' % (cell_name, row_number))
+                xf_index = int(attrs.get('s', '0'))
+                cell_type = attrs.get('t', 'n')
+                column_filter = x12sheet.column_filter
+                projected = column_filter is not None and colx not in column_filter and \
+                    (cell_type == 'n' or cell_type == 's')
+                tvalue = '#N/A' if cell_type == 'e' else None
+                is_parts = None
+            elif name == row_tag:
+                row_number = attrs.get('r')
+                if row_number is None: # Yes, it's optional.
+                    rowx += 1
+                    if x12sheet.verbosity and not x12sheet.warned_no_row_num:
+                        x12sheet.dumpout("no row number; assuming rowx=%d", rowx)
+                        x12sheet.warned_no_row_num = 1
+                else:
+                    rowx = int(row_number) - 1
+                assert 0 <= rowx < X12_MAX_ROWS
+                colx = -1
+                # as X12Sheet.do_row, rows are as wide as <dimension> says from the start
+                row_len = x12sheet.row_width
+                row_types = [XL_CELL_EMPTY] * row_len
+                row_values = [''] * row_len
+                row_ncols = 0
+                del text[:]
+            elif name == dimension_tag:
+                x12sheet.do_dimension(attrs)
+            elif name == merge_cell_tag:
+                x12sheet.do_merge_cell(attrs)
+
+        def end_element(name):
+            nonlocal row_len, row_ncols, cell_depth, tvalue, reading_text, is_parts
+            depth = cell_depth
+            if depth < 0:
+                if name == row_tag:
+                    parsed_rows.append((rowx, row_types, row_values, row_ncols))
+                return
+            cell_depth = depth - 1
+            if depth:
+                if reading_text and (name == v_tag or name == t_tag):
+                    reading_text = False
+                    if depth == 1:
+                        tvalue = cooked_text() if cell_type == 'str' else ''.join(text) or None
+                    else:
+                        t = cooked_text()
+                        if t:
+                            is_parts.append(t)
+                elif depth == 1 and name == is_tag and is_parts is not None:
+                    tvalue = ''.join(is_parts)
+                    is_parts = None
+                return
+
+            # end of <c>
+            if projected:
+                # as X12Sheet.do_row, kept empty wherever it would have been stored
+                if not tvalue and not formatting_info:
+                    return
+                ctype, value = XL_CELL_EMPTY, ''
+            elif cell_type == 'n':
+                if not tvalue:
+                    if not formatting_info:
+                        return
+                    ctype, value = XL_CELL_BLANK, ''
+                else:
+                    # we have a number, so look up the cell type
+                    ctype, value = xf_type_map[xf_index], float(tvalue)
+            elif cell_type == 's':
+                if not tvalue:
+                    if not formatting_info:
+                        return
+                    ctype, value = XL_CELL_BLANK, ''
+                else:
+                    ctype, value = XL_CELL_TEXT, sst[int(tvalue)]
+            elif cell_type == 'str':
+                ctype, value = XL_CELL_TEXT, tvalue
+            elif cell_type == 'b':
+                ctype, value = XL_CELL_BOOLEAN, cnv_xsd_boolean(tvalue)
+            elif cell_type == 'e':
+                ctype, value = XL_CELL_ERROR, error_code_from_text[tvalue]
+            elif cell_type == 'inlineStr':
+                if not tvalue:
+                    if not formatting_info:
+                        return
+                    ctype, value = XL_CELL_BLANK, ''
+                else:
+                    ctype, value = XL_CELL_TEXT, tvalue
+            else:
+                raise Exception("Unknown cell type %r in rowx=%d colx=%d" % (cell_type, rowx, colx))
+            if colx < row_len:
+                # within the preallocated width, or cells not in column order
+                row_types[colx] = ctype
+                row_values[colx] = value
+            else:
+                if colx > row_len:
+                    row_types.extend([XL_CELL_EMPTY] * (colx - row_len))
+                    row_values.extend([''] * (colx - row_len))
+                row_types.append(ctype)
+                row_values.append(value)
+                row_len = colx + 1
+            if colx >= row_ncols:
+                row_ncols = colx + 1
+
+        return start_element, end_element, text.append
+
+
+def cell_name_to_colx(cell_name, row_number=None):
+    """
+    Column index of a cell name, as :meth:`X12Sheet.do_row` works it out:
+    "A<row number>" => 0, "XFD<row number>" => 16383. The row number of
+    the name must equal ``row_number`` when it is given.
+    """
+    letter_value = _UPPERCASE_1_REL_INDEX
+    colx = 0
+    charx = -1
+    try:
+        for c in cell_name:
+            charx += 1
+            if c == '$':
+                continue
+            lv = letter_value[c]
+            if lv:
+                colx = colx * 26 + lv
+            else: # start of row number; can't be '0'
+                colx = colx - 1
+                assert 0 <= colx < X12_MAX_COLS
+                break
+    except KeyError:
+        raise Exception('Unexpected character %r in cell name %r' % (c, cell_name))
+    if row_number is not None and cell_name[charx:] != row_number:
+        raise Exception('cell name %r but row number is %r' % (cell_name, row_number))
+    return colx
+
+
+def get_xml_backend(name=None):
+    """
+    :param name: ``'etree'``, ``'lxml'`` or ``'expat'``; ``None`` is
+      ``'etree'``.
+    :returns: The backend parsing worksheets, see :class:`EtreeSheetBackend`
+      and :class:`ExpatSheetBackend`.
+    """
+    if name is None or name == 'etree':
+        return EtreeSheetBackend('etree')
+    if name == 'expat':
+        return ExpatSheetBackend()
+    if name == 'lxml':
+        try:
+            import lxml.etree
+        except ImportError:
+            raise XLRDError('xml backend lxml is not installed')
+        return EtreeSheetBackend('lxml', lxml.etree)
+    raise XLRDError('unknown xml backend %r' % name)
+
 def open_workbook_2007_xml(zf,
                            component_names,
                            logfile=sys.stdout,
@@ -788,7 +1268,14 @@ def open_workbook_2007_xml(zf,
                            use_mmap=0,
                            formatting_info=0,
                            on_demand=0,
-                           ragged_rows=0):
+                           ragged_rows=0,
+                           sheet_selector=None,
+                           shared_strings=None,
+                           values_only=False,
+                           lazy_shared_strings=False,
+                           shared_strings_cache_size=None,
+                           xml_backend=None,
+                           pipelined_inflate=False):
     ensure_elementtree_imported(verbosity, logfile)
     bk = Book()
     bk.logfile = logfile
@@ -798,48 +1285,142 @@ def open_workbook_2007_xml(zf,
         raise NotImplementedError("formatting_info=True not yet implemented")
     bk.use_mmap = False #### Not supported initially
     bk.on_demand = on_demand
-    if on_demand:
-        if verbosity:
-            print("WARNING *** on_demand=True not yet implemented; falling back to False", file=bk.logfile)
-        bk.on_demand = False
     bk.ragged_rows = ragged_rows
+    bk.xml_backend = get_xml_backend(xml_backend)
 
     x12book = X12Book(bk, logfile, verbosity)
-    zflo = zf.open(component_names['xl/_rels/workbook.xml.rels'])
-    x12book.process_rels(zflo)
-    del zflo
-    zflo = zf.open(component_names['xl/workbook.xml'])
-    x12book.process_stream(zflo, 'Workbook')
-    del zflo
+    process_workbook_2007_xml(x12book, zf, component_names)
     props_name = 'docprops/core.xml'
-    if props_name in component_names:
+    if props_name in component_names and not values_only:
         zflo = zf.open(component_names[props_name])
         x12book.process_coreprops(zflo)
 
     x12sty = X12Styles(bk, logfile, verbosity)
     if 'xl/styles.xml' in component_names:
         zflo = zf.open(component_names['xl/styles.xml'])
-        x12sty.process_stream(zflo, 'styles')
+        if values_only:
+            x12sty.process_values_stream(zflo, 'styles')
+        else:
+            x12sty.process_stream(zflo, 'styles')
         del zflo
     else:
         # seen in MS sample file MergedCells.xlsx
         pass
 
-    sst_fname = 'xl/sharedstrings.xml'
-    x12sst = X12SST(bk, logfile, verbosity)
-    if sst_fname in component_names:
-        zflo = zf.open(component_names[sst_fname])
-        x12sst.process_stream(zflo, 'SST')
-        del zflo
+    if shared_strings is not None:
+        # parsed once by the caller, shared by every load of this workbook
+        bk._sharedstrings = shared_strings
+    else:
+        process_sst_2007_xml(bk, zf, component_names, lazy_shared_strings, shared_strings_cache_size)
 
-    for sheetx in range(bk.nsheets):
-        fname = x12book.sheet_targets[sheetx]
-        zflo = zf.open(component_names[fname])
-        sheet = bk._sheet_list[sheetx]
-        x12sheet = X12Sheet(sheet, logfile, verbosity)
+    if sheet_selector is None:
+        sheet_order = list(range(bk.nsheets))
+    else:
+        sheet_order = [sheetx for sheetx in range(bk.nsheets) if sheet_selector(bk._sheet_names[sheetx])]
+    loader = X12SheetLoader(bk, x12book, zf, component_names, values_only,
+                            sheet_order if pipelined_inflate else None)
+    if on_demand:
+        # sheets are parsed by Book.get_sheet on first access, the zip is kept until release_resources
+        bk._sheet_list = [None] * bk.nsheets
+        bk._sheet_loader = loader
+        return bk
+
+    try:
+        for sheetx in range(bk.nsheets):
+            if sheetx not in sheet_order:
+                # not selected, never loaded
+                bk._sheet_list[sheetx] = None
+                continue
+            loader.process_sheet(bk._sheet_list[sheetx])
+    finally:
+        # the caller closes the zip, nothing may still be inflating from it
+        loader.stop_inflating()
+
+    if sheet_selector is not None:
+        # the zip is not kept, sheets left out can't be loaded later
+        bk._resources_released = 1
+
+    return bk
+
+
+class X12SheetLoader(object):
+    """
+    Parses worksheet parts of an xlsx zip into :class:`~xlrd.sheet.Sheet`
+    objects, either all at once or, in ``on_demand`` mode, one at a time
+    when :meth:`~xlrd.book.Book.get_sheet` asks for it.
+    """
+
+    def __init__(self, bk, x12book, zf, component_names, values_only=False, sheet_order=None):
+        self.bk = bk
+        self.x12book = x12book
+        self.zf = zf
+        self.component_names = component_names
+        self.values_only = values_only
+        # with a sheet order, worksheets are inflated by X12InflateStream and
+        # the next sheet in that order is started when one is opened
+        self.sheet_order = sheet_order
+        self._prefetched = {}
+        self._inflating = []
+
+    def open_sheet_stream(self, sheetx):
+        """
+        :returns: A file-like object of the worksheet XML, the caller closes it.
+        """
+        if self.sheet_order is None:
+            return self.zf.open(self.component_names[self.x12book.sheet_targets[sheetx]])
+        stream = self._prefetched.pop(sheetx, None)
+        if stream is None:
+            stream = self._start_inflate(sheetx)
+        if sheetx in self.sheet_order:
+            next_pos = self.sheet_order.index(sheetx) + 1
+            if next_pos < len(self.sheet_order):
+                next_sheetx = self.sheet_order[next_pos]
+                if next_sheetx not in self._prefetched:
+                    self._prefetched[next_sheetx] = self._start_inflate(next_sheetx)
+        return stream
+
+    def _start_inflate(self, sheetx):
+        stream = X12InflateStream(self.zf, self.component_names[self.x12book.sheet_targets[sheetx]])
+        self._inflating = [inflating for inflating in self._inflating if not inflating.closed]
+        self._inflating.append(stream)
+        return stream
+
+    def stop_inflating(self):
+        """
+        Close every stream still inflated by a thread, including those of
+        row iterators not read to the end, before the zip is closed.
+        """
+        for stream in self._inflating:
+            stream.close()
+        self._inflating = []
+        self._prefetched.clear()
+
+    def load_sheet(self, sheetx):
+        bk = self.bk
+        sheet = Sheet(bk, position=None, name=bk._sheet_names[sheetx], number=sheetx)
+        sheet.utter_max_rows = X12_MAX_ROWS
+        sheet.utter_max_cols = X12_MAX_COLS
+        self.process_sheet(sheet)
+        bk._sheet_list[sheetx] = sheet
+        return sheet
+
+    def process_sheet(self, sheet):
+        zf = self.zf
+        component_names = self.component_names
+        sheetx = sheet.number
+        fname = self.x12book.sheet_targets[sheetx]
+        zflo = self.open_sheet_stream(sheetx)
+        x12sheet = X12Sheet(sheet, self.bk.logfile, self.bk.verbosity, self.bk.xml_backend)
         heading = "Sheet %r (sheetx=%d) from %r" % (sheet.name, sheetx, fname)
-        x12sheet.process_stream(zflo, heading)
-        del zflo
+        try:
+            x12sheet.process_stream(zflo, heading)
+        finally:
+            zflo.close()
+
+        if self.values_only:
+            # relationships are only read to find the comments
+            sheet.tidy_dimensions()
+            return
 
         rels_fname = 'xl/worksheets/_rels/%s.rels' % fname.rsplit('/', 1)[-1]
         if rels_fname in component_names:
@@ -857,4 +1438,328 @@ def open_workbook_2007_xml(zf,
 
         sheet.tidy_dimensions()
 
-    return bk
+    def iter_rows(self, sheetx, nrows=None, xml=None):
+        """
+        :param xml: worksheet XML read instead of the sheet's own, e.g. a
+          chunk from :func:`split_worksheet_xml`.
+        :returns: An :class:`X12RowReader` of the sheet.
+        """
+        return X12RowReader(self, sheetx, nrows, xml)
+
+    def close(self):
+        self.stop_inflating()
+        self.zf.close()
+        self.zf = None
+
+
+class X12InflateStream(object):
+    """
+    Read-only stream of a zip member inflated by a background thread, which
+    stays at most ``max_chunks`` chunks ahead of the reader. zlib releases
+    the GIL, so the member is inflated while the reader parses.
+    """
+
+    def __init__(self, zf, name, chunk_size=64 * 1024, max_chunks=16):
+        self._chunks = Queue(max_chunks)
+        self._chunk = b''
+        self._pos = 0
+        self._eof = False
+        self.closed = False
+        self._thread = threading.Thread(target=self._inflate, args=(zf, name, chunk_size),
+                                        name='xlrd inflate %s' % name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _inflate(self, zf, name, chunk_size):
+        try:
+            with zf.open(name) as member:
+                while not self.closed:
+                    chunk = member.read(chunk_size)
+                    self._chunks.put(chunk)
+                    if not chunk:
+                        break
+        except Exception as e:
+            # raised again by read
+            self._chunks.put(e)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(1 << 20), b''))
+        chunk = self._chunk
+        pos = self._pos
+        if pos >= len(chunk):
+            if self._eof:
+                return b''
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                self._eof = True
+                raise chunk
+            if not chunk:
+                self._eof = True
+                return b''
+            self._chunk = chunk
+            pos = 0
+        if not pos and size >= len(chunk):
+            self._pos = len(chunk)
+            return chunk
+        self._pos = pos + size
+        return chunk[pos:pos + size]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._eof = True
+        # a producer blocked on a full queue is let go
+        while self._thread.is_alive():
+            try:
+                self._chunks.get(timeout=0.01)
+            except Empty:
+                pass
+        self._thread.join()
+
+
+class X12RowReader(object):
+    """
+    Iterator of ``(rowx, cell types, cell values)`` of each row of a sheet
+    that has cells, yielded while its XML is parsed; no cell grid is built.
+    """
+
+    def __init__(self, loader, sheetx, nrows=None, xml=None):
+        bk = loader.bk
+        self.sink = X12RowSink(bk, bk._sheet_names[sheetx], sheetx)
+        self.x12sheet = X12Sheet(self.sink, bk.logfile, bk.verbosity, bk.xml_backend)
+        self._rows = self._iter_rows(loader, sheetx, nrows, xml)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__
+
+    def project_columns(self, colxs):
+        """
+        Keep only the values of columns ``colxs`` in rows not yet yielded;
+        other cells are left empty before their values are converted, rows
+        and their widths are kept.
+        """
+        self.x12sheet.column_filter = frozenset(colxs)
+
+    def _iter_rows(self, loader, sheetx, max_nrows, xml):
+        sink = self.sink
+        x12sheet = self.x12sheet
+        fname = loader.x12book.sheet_targets[sheetx]
+        zflo = loader.open_sheet_stream(sheetx) if xml is None else BYTES_IO(xml)
+        heading = "Sheet %r (sheetx=%d) from %r" % (sink.name, sheetx, fname)
+        nrows = 0
+        try:
+            for rowx in x12sheet.iter_parsed_rows(zflo, heading):
+                if max_nrows is not None and rowx >= max_nrows:
+                    # the rest of the sheet XML is never parsed
+                    return
+                types, values = sink.take_row()
+                if types:
+                    nrows = rowx + 1
+                    yield rowx, types, values
+        finally:
+            zflo.close()
+        # same as Sheet.tidy_dimensions: merged cells below the last row add an empty one
+        merged_nrows = max([crange[1] for crange in sink.merged_cells] or [0])
+        if merged_nrows > nrows:
+            yield merged_nrows - 1, [XL_CELL_EMPTY], ['']
+
+
+class X12RowSink(object):
+    """
+    Stands in for :class:`~xlrd.sheet.Sheet` when a worksheet is streamed:
+    takes the cells of the current row only.
+    """
+
+    def __init__(self, bk, name, number):
+        self.book = bk
+        self.name = name
+        self.number = number
+        self.merged_cells = []
+        self.cell_note_map = {}
+        self._dimnrows = 0
+        self._dimncols = 0
+        self._xf_index_to_xl_type_map = bk._xf_index_to_xl_type_map
+        # rows are taken as X12Sheet builds them, no padding to a common width
+        self.ragged_rows = 1
+        self._types = []
+        self._values = []
+
+    def put_row(self, rowx, types, values, ncols):
+        self._types = types
+        self._values = values
+
+    def take_row(self):
+        row = self._types, self._values
+        self._types = []
+        self._values = []
+        return row
+
+def process_workbook_2007_xml(x12book, zf, component_names):
+    zflo = zf.open(component_names['xl/_rels/workbook.xml.rels'])
+    x12book.process_rels(zflo)
+    del zflo
+    zflo = zf.open(component_names['xl/workbook.xml'])
+    x12book.process_stream(zflo, 'Workbook')
+    del zflo
+
+def process_sst_2007_xml(bk, zf, component_names, lazy=False, cache_size=None):
+    sst_fname = 'xl/sharedstrings.xml'
+    x12sst = X12SST(bk, bk.logfile, bk.verbosity)
+    if sst_fname in component_names and lazy:
+        bk._sharedstrings = X12LazySST(zf.read(component_names[sst_fname]), cache_size)
+    elif sst_fname in component_names:
+        zflo = zf.open(component_names[sst_fname])
+        x12sst.process_stream(zflo, 'SST')
+        del zflo
+
+_SHEET_DATA_START = re.compile(br'<((?:[\w.-]+:)?)sheetData\b[^>]*?(/?)>')
+_ROW_NUMBER = re.compile(br'\sr\s*=\s*["\'](\d+)["\']')
+
+def split_worksheet_xml(xml, chunk_size, lead_rows=0):
+    """
+    Split worksheet XML at ``<row>`` tags into chunks of about ``chunk_size``
+    bytes, each one a worksheet document of its own that can be parsed
+    apart from the others, e.g. in another process.
+
+    Chunks only start at a row with an ``r`` attribute, in rising row order.
+    Rows before ``lead_rows`` (e.g. a header) are copied to the front of
+    every chunk. Cells merged below the last row are only in the last chunk.
+
+    :returns: A list of ``(first rowx, chunk XML)`` tuples in row order;
+      chunk ``i`` has the rows from its first rowx up to the first rowx of
+      chunk ``i + 1``, besides the lead rows. The first chunk's first rowx
+      is 0. The XML is left as one chunk when it can't be split.
+    """
+    unsplit = [(0, xml)]
+    sheet_data = _SHEET_DATA_START.search(xml)
+    if sheet_data is None or sheet_data.group(2):
+        return unsplit
+    rows_start = sheet_data.end()
+    sheet_data_end = b'</' + sheet_data.group(1) + b'sheetData>'
+    rows_end = xml.rfind(sheet_data_end)
+    if rows_end < rows_start:
+        return unsplit
+    chunk_end = sheet_data_end + xml[xml.rindex(b'</'):]
+    row_tag = re.compile(b'<' + re.escape(sheet_data.group(1)) + br'row[\s/>]')
+
+    def row_number(row_start):
+        tag_end = xml.find(b'>', row_start)
+        found = _ROW_NUMBER.search(xml, row_start, tag_end)
+        return None if found is None else int(found.group(1))
+
+    # the lead rows end at the first row at or below lead_rows
+    lead_end = None
+    rowx = -1
+    for row in row_tag.finditer(xml, rows_start, rows_end):
+        number = row_number(row.start())
+        rowx = rowx + 1 if number is None else number - 1
+        if rowx >= lead_rows:
+            lead_end = row.start()
+            break
+    if lead_end is None:
+        return unsplit
+
+    starts = []
+    last_rowx = lead_rows - 1
+    pos = lead_end + chunk_size
+    while pos < rows_end:
+        row = row_tag.search(xml, pos, rows_end)
+        if row is None:
+            break
+        number = row_number(row.start())
+        if number is None or number - 1 <= last_rowx:
+            # rows are only numbered by order, or out of order
+            pos = row.end()
+            continue
+        last_rowx = number - 1
+        starts.append((last_rowx, row.start()))
+        pos = row.start() + chunk_size
+    if not starts:
+        return unsplit
+
+    head = xml[:rows_start]
+    lead = xml[rows_start:lead_end]
+    chunks = [(0, xml[:starts[0][1]] + chunk_end)]
+    for index, (first_rowx, start) in enumerate(starts):
+        if index + 1 < len(starts):
+            chunks.append((first_rowx, head + lead + xml[start:starts[index + 1][1]] + chunk_end))
+        else:
+            chunks.append((first_rowx, head + lead + xml[start:]))
+    return chunks
+
+def split_sheet_xml_2007(zf,
+                         component_names,
+                         sheet_name,
+                         chunk_size,
+                         lead_rows=0,
+                         logfile=sys.stdout,
+                         verbosity=0):
+    """
+    Inflate a worksheet and split its XML, see :func:`split_worksheet_xml`.
+    """
+    ensure_elementtree_imported(verbosity, logfile)
+    bk = Book()
+    bk.logfile = logfile
+    bk.verbosity = verbosity
+    bk.formatting_info = 0
+    bk.ragged_rows = 0
+    x12book = X12Book(bk, logfile, verbosity)
+    process_workbook_2007_xml(x12book, zf, component_names)
+    try:
+        sheetx = bk._sheet_names.index(sheet_name)
+    except ValueError:
+        raise XLRDError('No sheet named <%r>' % sheet_name)
+    xml = zf.read(component_names[x12book.sheet_targets[sheetx]])
+    return split_worksheet_xml(xml, chunk_size, lead_rows)
+
+def load_shared_strings_2007_xml(zf,
+                                 component_names,
+                                 logfile=sys.stdout,
+                                 verbosity=0,
+                                 lazy=False,
+                                 cache_size=None):
+    ensure_elementtree_imported(verbosity, logfile)
+    bk = Book()
+    bk.logfile = logfile
+    bk.verbosity = verbosity
+    process_sst_2007_xml(bk, zf, component_names, lazy, cache_size)
+    return bk._sharedstrings
+
+def sheet_fingerprints_2007_xml(zf,
+                                component_names,
+                                logfile=sys.stdout,
+                                verbosity=0):
+    """
+    Fingerprint of each worksheet taken from the zip central directory,
+    the worksheet and shared strings streams are not decompressed.
+
+    :returns: dict of sheet name => (sheet CRC32, sheet size, SST CRC32, SST size)
+    """
+    ensure_elementtree_imported(verbosity, logfile)
+    bk = Book()
+    bk.logfile = logfile
+    bk.verbosity = verbosity
+    bk.formatting_info = 0
+    bk.ragged_rows = 0
+    x12book = X12Book(bk, logfile, verbosity)
+    process_workbook_2007_xml(x12book, zf, component_names)
+
+    sst_fname = 'xl/sharedstrings.xml'
+    if sst_fname in component_names:
+        sst_info = zf.getinfo(component_names[sst_fname])
+        sst_fingerprint = (sst_info.CRC, sst_info.file_size)
+    else:
+        sst_fingerprint = (0, 0)
+
+    fingerprints = {}
+    for sheetx in range(bk.nsheets):
+        sheet_info = zf.getinfo(component_names[x12book.sheet_targets[sheetx]])
+        fingerprints[bk._sheet_names[sheetx]] = (sheet_info.CRC, sheet_info.file_size) + sst_fingerprint
+    return fingerprints
@@ -1,3 +1,4 @@
+import fnmatch
 import glob
 import os.path
 import re
@@ -5,11 +6,13 @@ import re
 from enum import IntEnum
 from . import xlrd
 from .table import Table, Header
+from .columnar import ColumnarTable
+from .streamed import StreamedSheet
 from .data import DataType
 from .field import Field
 from .setting import TagFilterSetting
-from .elem import ElemAnalyzer
-from .cell_util import cell_str, cell_xls_coord_str
+from .elem import ElemAnalyzer, shared_parse_cache
+from .cell_util import cell_str, cell_int, cell_xls_coord_str
 from .tag import Tag
 from .row import Row, RowSemantic
 
@@ -21,6 +24,10 @@ TableList = List[Table]
 TableDict = Dict[Tag, TableList]
 
 
+# xls files the build collects from xls dir
+XlsFilePatterns = ["*.xlsx", "*.xlsm"]
+
+
 def collect_xls_files(src_dir, xls_patterns):
     all_xls_files = []
     for xls_pattern in xls_patterns:
@@ -33,6 +40,14 @@ def collect_xls_files(src_dir, xls_patterns):
     return all_xls_files
 
 
+def is_collected_xls_name(xls_name, xls_patterns):
+    """
+    :param xls_name: file name without dir
+    :return: whether collect_xls_files collects a file of this name
+    """
+    return -1 == xls_name.find("~$") and any(fnmatch.fnmatch(xls_name, xls_pattern) for xls_pattern in xls_patterns)
+
+
 def is_valid_xls_sheet(sheet_name):
     return re.search("^[a-zA-Z]+$", sheet_name)
 
@@ -48,7 +63,26 @@ class XlsParser:
         FieldTypeEmpty = 1,
         Error = 2
 
-    def parse_one_sheet(self, xls_path, table_name):
+    def __init__(self, columnar=False, parse_cache=None, schema_only=False, xml_backend=None):
+        """
+        :param columnar: build ColumnarTable, one typed column per field instead of a Row per row
+        :param parse_cache: ParseCache of cell literals, shared cache of the process if None
+        :param schema_only: schema probe, tables only have header, body rows are neither read nor checked
+        :param xml_backend: xlsx sheet xml parser, 'etree', 'lxml' or 'expat', xlrd default if None
+        """
+        self.columnar = columnar
+        self.parse_cache = shared_parse_cache if parse_cache is None else parse_cache
+        self.schema_only = schema_only
+        self.xml_backend = xml_backend
+
+    def parse_one_sheet(self, xls_path, table_name, shared_strings=None):
+        """
+        parse a single sheet, other sheets of the xls are not loaded, shared strings are decoded as the sheet uses them
+        :param xls_path: xls file path
+        :param table_name: sheet name
+        :param shared_strings: shared strings of the xlsx parsed before, see xlrd.load_shared_strings
+        :return: [bool, table_or_err]
+        """
         if not is_valid_xls_sheet(table_name):
             return [False, f'{table_name} is not a valid export table name']
 
@@ -57,40 +91,167 @@ class XlsParser:
         table_or_err = None
 
         try:
-            book = xlrd.open_workbook(abs_xls)
-            sheet = book.sheet_by_name(table_name)
-            rs, table_or_err = self.parse_xls_sheet(xls_path, sheet)
+            with xlrd.open_workbook(abs_xls, on_demand=True, shared_strings=shared_strings,
+                                    values_only=True, lazy_shared_strings=True,
+                                    xml_backend=self.xml_backend) as book:
+                rs, table_or_err = self.parse_book_sheet(xls_path, book, table_name)
         except Exception as err:
             rs = False
             table_or_err = err
         finally:
             return rs, table_or_err
 
-    def parse_one_xls(self, xls_path) -> list:
+    def parse_sheet_chunk(self, xls_path, table_name, chunk_xml, shared_strings=None):
+        """
+        parse one chunk of a big sheet split by xlrd.split_sheet_xml, header rows lead every chunk
+        body rows of the chunk start at its first row with cells, see join_chunk_results
+        :param chunk_xml: worksheet xml of the chunk
+        :param shared_strings: shared strings of the xlsx parsed before, decoded as the chunk uses them if None
+        :return: [bool, table_or_err, body_rows], body_rows is [first, end) of table rows, None if table has no row
+        """
         abs_xls = os.path.abspath(xls_path)
-        book = xlrd.open_workbook(abs_xls)
-        xls_tables = []
-        for sheet in book.sheets():
-            if is_valid_xls_sheet(sheet.name):
+        rs = True
+        table_or_err = None
+        body_rows = None
+
+        try:
+            with xlrd.open_workbook(abs_xls, on_demand=True, shared_strings=shared_strings,
+                                    values_only=True, lazy_shared_strings=True,
+                                    xml_backend=self.xml_backend) as book:
+                sheet = StreamedSheet(table_name, book.iter_sheet_rows(table_name, xml=chunk_xml), chunk=True)
+                sheet.load_header(self.ContentStartRow)
                 rs, table_or_err = self.parse_xls_sheet(xls_path, sheet)
-                xls_tables.append([rs, table_or_err])
+                body_rows = sheet.body_rows
+        except Exception as err:
+            rs = False
+            table_or_err = err
+        finally:
+            return [rs, table_or_err, body_rows]
 
-        return xls_tables
+    @staticmethod
+    def join_chunk_results(chunk_results):
+        """
+        join chunks of a sheet into the table parse_one_sheet gives, rows without cells between chunks are design spec
+        :param chunk_results: [bool, table_or_err, body_rows] of every chunk in row order, see parse_sheet_chunk
+        :return: [bool, table_or_err]
+        """
+        failed_results = [chunk_result for chunk_result in chunk_results if not chunk_result[0]]
+        if failed_results:
+            # header errors are the same in every chunk, but an empty header only tells an empty sheet without rows
+            rs, err, _ = next((failed_result for failed_result in failed_results if failed_result[2] is not None),
+                              failed_results[0])
+            return [rs, err]
+
+        first_table = chunk_results[0][1]
+        table = type(first_table)(first_table.name, first_table.xls)
+        table.set_header(first_table.header)
+        fields = first_table.header.get_fields()
+
+        next_row = XlsParser.ContentStartRow
+        for _, chunk_table, body_rows in chunk_results:
+            # cells merged below the last row make a row of the last chunk, already covered by rows before
+            if body_rows is None or body_rows[0] < next_row:
+                continue
+
+            for _ in range(next_row, body_rows[0]):
+                table.add_row(XlsParser._empty_row(fields))
+            table.extend(chunk_table)
+            next_row = body_rows[1]
+
+        return [True, table]
+
+    def parse_one_xls(self, xls_path) -> list:
+        return [sheet_result for _, _, sheet_result in self.parse_xls_sheets(xls_path)]
+
+    def parse_xls_sheets(self, xls_path, cached_fingerprints: dict = None) -> list:
+        """
+        parse export sheets of xls, skip sheets whose xlsx zip member fingerprint equals the cached one
+        :param xls_path: xls file path
+        :param cached_fingerprints: sheet name => fingerprint of sheets parsed last build
+        :return: list of [sheet_name, fingerprint, [bool, table_or_err]], result is None if sheet is unchanged
+        """
+        abs_xls = os.path.abspath(xls_path)
+        # None for xls, no cheap fingerprint, always parse
+        fingerprints = dict(self.export_sheet_fingerprints(abs_xls) or [])
+        cached_fingerprints = cached_fingerprints or {}
+
+        unchanged_sheets = set()
+        for sheet_name, fingerprint in fingerprints.items():
+            if cached_fingerprints.get(sheet_name) == fingerprint:
+                unchanged_sheets.add(sheet_name)
+
+        sheet_results = []
+        # rows of each sheet are parsed as they are read, no sheet's cell grid is held
+        # a schema probe only reads header rows, most shared strings are never used
+        with xlrd.open_workbook(abs_xls, on_demand=True, values_only=True,
+                                lazy_shared_strings=self.schema_only, xml_backend=self.xml_backend) as book:
+            for sheet_name in book.sheet_names():
+                if not is_valid_xls_sheet(sheet_name):
+                    continue
+
+                fingerprint = fingerprints.get(sheet_name)
+                if sheet_name in unchanged_sheets:
+                    sheet_results.append([sheet_name, fingerprint, None])
+                else:
+                    sheet_results.append([sheet_name, fingerprint,
+                                          self.parse_sheet_rows(xls_path, sheet_name,
+                                                                self._iter_sheet_rows(book, sheet_name))])
+                    # xls sheets are still loaded as a whole
+                    book.unload_sheet(sheet_name)
+
+        return sheet_results
+
+    @staticmethod
+    def export_sheet_fingerprints(xls_path):
+        """
+        :param xls_path: xls file path
+        :return: list of [sheet_name, fingerprint] of export sheets in sheet order, None if xls is not xlsx
+        """
+        fingerprints = xlrd.sheet_fingerprints(os.path.abspath(xls_path))
+        if fingerprints is None:
+            return None
+
+        return [[sheet_name, fingerprint] for sheet_name, fingerprint in fingerprints.items()
+                if is_valid_xls_sheet(sheet_name)]
+
+    def parse_sheet_rows(self, xls_path, sheet_name, rows):
+        """
+        parse a sheet from its rows as they are read, header rows are held, body rows are checked one by one
+        :param rows: iterator of (rowx, cell types, cell values) in row order, see xlrd Book.iter_sheet_rows
+        :return: [bool, table_or_err]
+        """
+        sheet = StreamedSheet(sheet_name, rows)
+        sheet.load_header(self.ContentStartRow)
+        return self.parse_xls_sheet(xls_path, sheet)
+
+    def parse_book_sheet(self, xls_path, book, sheet_name):
+        """
+        parse a sheet of a workbook opened before, e.g. kept open between previews
+        :param book: xlrd Book opened on demand
+        :return: [bool, table_or_err]
+        """
+        return self.parse_sheet_rows(xls_path, sheet_name, self._iter_sheet_rows(book, sheet_name))
+
+    def _iter_sheet_rows(self, book, sheet_name):
+        if self.schema_only:
+            # header rows and the first body row, which tells an empty header from an empty sheet
+            return book.iter_sheet_rows(sheet_name, self.ContentStartRow + 1)
+
+        return book.iter_sheet_rows(sheet_name)
 
     def parse_xls_sheet(self, xls_path, sheet):
         rs, header_or_err = self._parse_header(sheet)
 
         if rs:
             if len(header_or_err.get_fields()) > 0:
-                tab = Table(sheet.name, xls_path)
+                tab = ColumnarTable(sheet.name, xls_path) if self.columnar else Table(sheet.name, xls_path)
                 tab.set_header(header_or_err)
-                rs, body_or_err = self._parse_body(sheet, tab.header.get_fields())
+                rs, err = [True, None] if self.schema_only else self._parse_body(sheet, tab)
 
                 if rs:
-                    tab.set_body(body_or_err)
                     return [True, tab]
                 else:
-                    return [False, f'{xls_path}, {body_or_err}']
+                    return [False, f'{xls_path}, {err}']
             else:
                 return [False, f'{xls_path}, {sheet.name} has no valid export field']
         else:
@@ -156,66 +317,108 @@ class XlsParser:
             return [XlsParser.FieldState.FieldTypeEmpty,
                     f'Field Name at {cell_xls_coord_str(self.FieldNameRow, col)} is Empty']
 
-    def _parse_body(self, sheet, fields):
-        body = []
-        for row in range(self.ContentStartRow, sheet.nrows):
-            rs, body_row_or_err = self._parse_row(sheet, fields, row)
+    def _parse_body(self, sheet, tab):
+        """
+        parse rows into tab
+        :return: [bool, err]
+        """
+        fields = tab.header.get_fields()
+        converters = self._compile_converters(fields)
+        if isinstance(sheet, StreamedSheet):
+            rows = sheet.load_rows(self.ContentStartRow, [field.sheet_col for field in fields])
+        else:
+            rows = range(self.ContentStartRow, sheet.nrows)
+
+        for row in rows:
+            rs, body_row_or_err = self._parse_row(sheet, fields, converters, row)
             if rs:
-                body.append(body_row_or_err)
+                tab.add_row(body_row_or_err)
             else:
                 return [False, f'sheet : {sheet.name}, {body_row_or_err}']
 
-        return [True, body]
+        return [True, None]
+
+    def _compile_converters(self, fields):
+        """
+        resolve value converter of every field once, rows only call them
+        :return: converter of each field, (sheet, row, col) => [bool, text_for_csv_or_err, actual_values]
+        """
+        return [self._compile_converter(field) for field in fields]
+
+    def _compile_converter(self, field):
+        checker = self.parse_cache.get_converter(field.data_type)
+
+        def convert(sheet, row, col):
+            value_str = cell_str(sheet, row, col).strip()
+            try:
+                # (Bool, text_for_csv, actual_values)
+                return checker(value_str)
+            except Exception as err:
+                return [False, f'check {value_str} exception {err}']
+
+        if ElemAnalyzer.ElemType.Int != ElemAnalyzer.to_elem_type(field.data_type.elem_type,
+                                                                  field.data_type.organization):
+            return convert
+
+        # number cell of INT field is an int already, only text cells are parsed
+        def convert_int(sheet, row, col):
+            number = cell_int(sheet, row, col)
+            if number is None:
+                return convert(sheet, row, col)
+
+            return [True, str(number), number]
+
+        return convert_int
+
+    @staticmethod
+    def _empty_row(fields):
+        """
+        :return: row without cells, a design spec row
+        """
+        empty_row = Row()
+        empty_row.semantic = RowSemantic.DesignSpec
+        for _ in fields:
+            empty_row.add_csv('')
+            empty_row.add_value('')
+        return empty_row
 
     @staticmethod
-    def _parse_row(sheet, fields, row):
+    def _parse_row(sheet, fields, converters, row):
         body_row = Row()
         primary = fields[0]
 
-        primary_str = cell_str(sheet, row, primary.sheet_col).strip()
-
-        check = True
-        if not primary_str:
-            body_row.semantic = RowSemantic.DesignSpec
-            check = False
-
-        rs, csv_text_or_err, parsed_value = XlsParser._check_value(primary, primary_str, check)
+        # no converter accepts empty text, so the primary text is only needed when conversion fails
+        rs, csv_text_or_err, parsed_value = converters[0](sheet, row, primary.sheet_col)
 
         if rs:
             body_row.add_csv(csv_text_or_err)
             body_row.add_value(parsed_value)
         else:
+            primary_str = cell_str(sheet, row, primary.sheet_col).strip()
+
+            # design spec row, values are not checked
+            if not primary_str:
+                body_row.semantic = RowSemantic.DesignSpec
+                body_row.add_csv(primary_str)
+                body_row.add_value('')
+                for field in fields[1:]:
+                    body_row.add_csv(cell_str(sheet, row, field.sheet_col).strip())
+                    body_row.add_value('')
+
+                return [True, body_row]
+
             return [False, f'{primary.field_name} at {cell_xls_coord_str(row, primary.sheet_col)} value {primary_str} '
                            f'is not {primary.data_type.to_csv_str()}']
 
-        for field in fields[1:]:
-            value_str = cell_str(sheet, row, field.sheet_col).strip()
-            rs, csv_text_or_err, parsed_value = XlsParser._check_value(field, value_str, check)
+        for field, converter in zip(fields[1:], converters[1:]):
+            rs, csv_text_or_err, parsed_value = converter(sheet, row, field.sheet_col)
 
             if rs:
                 body_row.add_csv(csv_text_or_err)
                 body_row.add_value(parsed_value)
             else:
+                value_str = cell_str(sheet, row, field.sheet_col).strip()
                 return [False, f'{field.field_name} at {cell_xls_coord_str(row, field.sheet_col)} value {value_str} '
                                f'is not {field.data_type.to_csv_str()}, because {csv_text_or_err}']
 
         return [True, body_row]
-
-    @staticmethod
-    def _check_value(field, value_str, check):
-        """
-        parse value by field setting
-        :param field:
-        :param value_str:
-        :param check:
-        :return: [bool, text_for_csv, actual_values]
-        """
-        if check:
-            checker = ElemAnalyzer.get_checker(field.data_type)
-            try:
-                # (Bool, text_for_csv, actual_values)
-                return checker(value_str)
-            except Exception as err:
-                return [False, f'check {value_str} exception {err}']
-        else:
-            return [True, value_str, '']